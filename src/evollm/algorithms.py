@@ -1,18 +1,31 @@
+import ast
+import hashlib
 import importlib
 import inspect
 import os
 
 import axelrod as axl
 
-from evollm import common
+from evollm import common, rank_index, rewrite
 
 
-def load_module(module_path: str):
+def module_file(module_path: str) -> str:
+  """Absolute path of the module file, adding .py if missing."""
+  if not module_path.endswith(".py"):
+    module_path += ".py"
+  return os.path.abspath(module_path)
+
+
+def load_module(module_path: str, rewrite_strategies: bool = False, skipped_lines: set[int] | None = None,
+                tree: ast.Module | None = None):
   """
   Load a Python module from either an absolute or relative path.
 
   Args:
       module_path (str): Path to the Python module
+      rewrite_strategies (bool): Compile strategies onto the incremental history statistics
+      skipped_lines (set[int]): Lines left out of the module, keeping the numbers of the others
+      tree (ast.Module): Already parsed source of the module, compiled instead of the file
 
   Returns:
       module: The loaded Python module
@@ -38,25 +51,92 @@ def load_module(module_path: str):
       raise ImportError(f"Could not load module specification from {module_path}")
 
   module = importlib.util.module_from_spec(spec)
-  spec.loader.exec_module(module)
+  if tree is None and (rewrite_strategies or skipped_lines):
+    with open(module_path, encoding="utf8") as f:
+      source = "".join("\n" if i in (skipped_lines or ()) else line for i, line in enumerate(f, 1))
+    tree = ast.parse(source, module_path)
+  if tree is not None:
+    if rewrite_strategies:
+      tree, _ = rewrite.rewrite_tree(tree)
+    exec(compile(tree, module_path, "exec"), module.__dict__)
+  else:
+    spec.loader.exec_module(module)
 
   return module
 
 
-def load_algorithms(module_name: str, keep_top: float=0, keep_bottom: float=1) -> list[type[common.LLM_Strategy]]:
-  module = load_module(module_name)
+def source_hashes(tree: ast.Module) -> dict[str, str]:
+  """Hash of the normalised source of every top-level class of a parsed module, by class name.
+
+  The AST ignores formatting and comments. Module-level imports and functions are included with
+  each class, while module-level assignments such as the *_ranks lists are not.
+  """
+  shared = "".join(ast.dump(node) for node in tree.body
+                   if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef)))
+  return {node.name: hashlib.sha256((shared + ast.dump(node)).encode()).hexdigest()
+          for node in tree.body if isinstance(node, ast.ClassDef)}
+
+
+def _draws_random(node: ast.AST) -> bool:
+  return any(isinstance(n, ast.Attribute) and n.attr in ("_random", "random") or
+             isinstance(n, ast.Name) and n.id in ("random", "np", "numpy")
+             for n in ast.walk(node))
 
+
+def random_classes(tree: ast.Module) -> set[str]:
+  """Names of the top-level classes of a parsed module whose source may draw random numbers.
+
+  A class draws if it, or any module-level function it could call, refers to the player random
+  generator or to the random and numpy modules. The others play deterministically without noise.
+  """
+  shared = any(_draws_random(node) for node in tree.body if isinstance(node, ast.FunctionDef))
+  return {node.name for node in tree.body
+          if isinstance(node, ast.ClassDef) and (shared or _draws_random(node))}
+
+
+def kept(ranks: list[list[str]], keep_top: float, keep_bottom: float) -> list[str]:
+  """Names between the keep_top and keep_bottom fractions of each ranking."""
+  return [name for r in ranks for name in r[int(len(r) * keep_top):int(len(r) * keep_bottom)]]
+
+
+def strategy_classes(module) -> list[type[common.LLM_Strategy]]:
   # Get all classes from the module that are derived from axelrod.Player
-  algos = [
+  return [
     cls for name, cls in inspect.getmembers(module)
     if inspect.isclass(cls) and issubclass(cls, common.LLM_Strategy) and cls != common.LLM_Strategy
   ]
 
+
+def load_algorithms(module_name: str, keep_top: float=0, keep_bottom: float=1, rewrite: bool=False) -> list[type[common.LLM_Strategy]]:
   assert keep_top < keep_bottom, "keep_top must be less than keep_bottom"
-  if keep_top > 0 or keep_bottom < 1:
-    names = []
-    for ranks in [module.Aggressive_ranks, module.Cooperative_ranks, module.Neutral_ranks]:
-      names += ranks[int(len(ranks) * keep_top):int(len(ranks) * keep_bottom)]
+  select = keep_top > 0 or keep_bottom < 1
+  index = rank_index.read(module_file(module_name)) if select else None
+  if index is not None:
+    # The ranks and metadata come from the index, and only the selected classes are compiled
+    names = kept(list(index["ranks"].values()), keep_top, keep_bottom)
+    module = load_module(module_name, rewrite, rank_index.skipped_lines(index, names))
+    algos = [a for a in strategy_classes(module) if a.__name__ in names]
+    for a in algos:
+      a.source_hash = index["strategies"][a.__name__]["source_hash"]
+      a.deterministic = index["strategies"][a.__name__]["deterministic"]
+    return algos
+
+  path = module_file(module_name)
+  with open(path, encoding="utf8") as f:
+    tree = ast.parse(f.read(), path)
+  # Before the rewrite changes the tree
+  hashes, draws = source_hashes(tree), random_classes(tree)
+  module = load_module(path, rewrite, tree=tree)
+  algos = strategy_classes(module)
+  for a in algos:
+    a.source_hash = hashes.get(a.__name__)
+    a.deterministic = a.__name__ in hashes and a.__name__ not in draws
+
+  if select:
+    if not all(hasattr(module, f"{name}_ranks") for name in ("Aggressive", "Cooperative", "Neutral")):
+      raise ValueError(f"{module_name} has no ranks to select keep_top and keep_bottom from, or the module "
+                       f"changed since they were written: run rank_strategies.py --algo {module_name} first")
+    names = kept([module.Aggressive_ranks, module.Cooperative_ranks, module.Neutral_ranks], keep_top, keep_bottom)
     algos = [a for a in algos if a.__name__ in names]
 
   return algos
@@ -1,7 +1,11 @@
 import argparse
 import axelrod as axl
+from collections import deque
 from enum import StrEnum
 from functools import partial, wraps
+from itertools import islice
+
+from evollm.history import ActionHistory, HistoryStats
 
 
 def positive_int(x):
@@ -65,11 +69,32 @@ class Classic(axl.Game):
     super().__init__(r=3, s=0, t=5, p=1)
 
 
+# Opponents of the Beaufils tournament
+BEAUFILS_OPPONENTS: list[type[axl.Player]] = [
+    axl.Cooperator,
+    axl.Defector,
+    axl.Random,
+    axl.TitForTat,
+    axl.Grudger,
+    axl.CyclerDDC,
+    axl.CyclerCCD,
+    axl.GoByMajority,
+    axl.SuspiciousTitForTat,
+    axl.Prober,
+    # axl.OriginalGradual,
+    axl.WinStayLoseShift,
+]
+
+
 def auto_update_score(strategy_method):
   @wraps(strategy_method)
   def wrapper(self, opponent):
-    self.update_score(opponent)
+    # The fast match engine scores rounds itself
+    if not self.externally_scored:
+      self.update_score(opponent)
     return strategy_method(self, opponent)
+  # What the fast match engine calls once it scores the rounds
+  wrapper.scored_strategy = strategy_method
   return wrapper
 
 
@@ -87,10 +112,30 @@ def get_game(name: str) -> axl.Game:
 
 
 class LLM_Strategy(axl.player.Player):
+  # Number of joint outcomes kept for recent_outcomes
+  outcome_memory: int = 100
+  # Set by algorithms.load_algorithms, identifies the strategy in evollm.match_cache
+  source_hash: str | None = None
+  # Set by algorithms.load_algorithms when the strategy never draws random numbers
+  deterministic: bool = False
+
   def __init__(self) -> None:
     super().__init__()
+    # Slices of the history are views rather than copies
+    self._history = ActionHistory()
     self._score: int = 0
     self._rounds_scored: int = 0
+    self._outcomes: deque[tuple[axl.Action, axl.Action]] = deque(maxlen=self.outcome_memory)
+    self._outcome_streak: int = 0
+    # _own_payoffs[t] is the total payoff over the first t rounds, likewise for the opponent
+    self._own_payoffs: list[int] = [0]
+    self._opponent_payoffs: list[int] = [0]
+    self._opponent_history: axl.History | None = None
+    # Payoffs of the game last scored, by (own is D, opponent is D)
+    self._game: axl.Game | None = None
+    self._payoff_table: list[list[tuple[int, int]]] = []
+    # Set by evollm.engine, which calls _start_match and _score_round instead of update_score
+    self.externally_scored: bool = False
 
   def __repr__(self) -> str:
     return self.__class__.__name__
@@ -111,22 +156,112 @@ class LLM_Strategy(axl.player.Player):
   def first_round(self) -> bool:
     return not self.history
 
+  @property
+  def own_stats(self) -> HistoryStats:
+    """Running counts of this player's actions, kept by its history."""
+    return self.history.stats
+
+  @property
+  def opponent_stats(self) -> HistoryStats:
+    """Running counts of the opponent's actions, kept by its history once the match has started."""
+    history = self._opponent_history
+    assert isinstance(history, ActionHistory), "The opponent's history is only known once the match has started"
+    return history.stats
+
+  def recent_outcomes(self, n: int) -> list[tuple[axl.Action, axl.Action]]:
+    """The last n (own, opponent) action pairs, oldest first (at most outcome_memory)."""
+    if n <= 0:
+      return []
+    return list(islice(reversed(self._outcomes), n))[::-1]
+
+  def outcome_streak(self, outcome: tuple[axl.Action, axl.Action]) -> int:
+    """Number of consecutive rounds ending with the last round that had this outcome."""
+    if self._outcomes and self._outcomes[-1] == outcome:
+      return self._outcome_streak
+    return 0
+
+  def _record_round(self, own: axl.Action, opponent: axl.Action) -> None:
+    outcome = (own, opponent)
+    if self._outcomes and self._outcomes[-1] == outcome:
+      self._outcome_streak += 1
+    else:
+      self._outcome_streak = 1
+    self._outcomes.append(outcome)
+
+  def window_scores(self, start: int | None = None, stop: int | None = None) -> tuple[int, int]:
+    """Total (own, opponent) payoffs over rounds[start:stop], in O(1)."""
+    start, stop, _ = slice(start, stop).indices(self._rounds_scored)
+    stop = max(start, stop)
+    return (self._own_payoffs[stop] - self._own_payoffs[start],
+            self._opponent_payoffs[stop] - self._opponent_payoffs[start])
+
+  def recent_scores(self, n: int) -> tuple[int, int]:
+    """Total (own, opponent) payoffs over the last n rounds."""
+    return self.window_scores(-n, None) if n > 0 else (0, 0)
+
+  def _window(self, player_history, opponent_history) -> tuple[int, int] | None:
+    """(start, stop) if the histories are the same rounds of this match, else None."""
+    rounds = self._rounds_scored
+    if rounds == 0 or self._opponent_history is None or len(self.history) != rounds:
+      return None
+    if player_history is self.history and opponent_history is self._opponent_history:
+      return 0, rounds
+
+    # Views into both histories carry their rounds
+    window = self.history.window(player_history)
+    if window is not None and isinstance(self._opponent_history, ActionHistory):
+      if window == self._opponent_history.window(opponent_history) and window[0] < window[1]:
+        return window
+      return None
+
+    # Otherwise only recognise the last n rounds
+    if not isinstance(player_history, list) or not isinstance(opponent_history, list):
+      return None
+    n = len(player_history)
+    if not 0 < n <= rounds or len(opponent_history) != n:
+      return None
+    # Equal actions give equal scores, so comparing values is enough
+    if self.history[-n:] == player_history and self._opponent_history[-n:] == opponent_history:
+      return rounds - n, rounds
+    return None
+
   def total_scores(self, player_history, opponent_history) -> tuple[int, int]:
+    window = self._window(player_history, opponent_history)
+    if window is not None:
+      return self.window_scores(*window)
     game = self.match_attributes["game"]
     return axl.interaction_utils.compute_final_score(zip(player_history, opponent_history), game)
 
+  def _start_match(self, opponent: axl.player.Player) -> None:
+    if not isinstance(opponent, LLM_Strategy):
+      opponent.score = 0
+      # Give the opponent's (still empty) history the same views as ours
+      if type(opponent.history) is axl.History:
+        opponent._history = ActionHistory()
+    self._opponent_history = opponent.history
+
+  def _score_round(self, opponent: axl.player.Player, last_round: tuple[axl.Action, axl.Action], game: axl.Game) -> None:
+    self._rounds_scored += 1
+    self._record_round(*last_round)
+    if game is not self._game:
+      self._game = game
+      self._payoff_table = [[game.score((own, other)) for other in (axl.Action.C, axl.Action.D)]
+                            for own in (axl.Action.C, axl.Action.D)]
+    own, other = last_round
+    own_payoff, opponent_payoff = self._payoff_table[own is axl.Action.D][other is axl.Action.D]
+    self._own_payoffs.append(self._own_payoffs[-1] + own_payoff)
+    self._opponent_payoffs.append(self._opponent_payoffs[-1] + opponent_payoff)
+    self._score += own_payoff
+    # Hack for running against non-LLM_Strategies
+    if not isinstance(opponent, LLM_Strategy):
+      opponent.score += opponent_payoff
+
   def update_score(self, opponent: axl.player.Player):
     game = self.match_attributes["game"]
 
     if len(self.history):
-      self._rounds_scored += 1
-      assert len(self.history) == self._rounds_scored, "Only update the score once per game"
+      assert len(self.history) == self._rounds_scored + 1, "Only update the score once per game"
       assert len(self.history) == len(opponent.history), f"Players have different history lengths: {len(self.history)}, {len(opponent.history)}"
-      last_round = (self.history[-1], opponent.history[-1])
-      self._score += game.score(last_round)[0]
-      # Hack for running against non-LLM_Strategies
-      if not isinstance(opponent, LLM_Strategy):
-        opponent.score += game.score(last_round)[1]
+      self._score_round(opponent, (self.history[-1], opponent.history[-1]), game)
     else:
-      if not isinstance(opponent, LLM_Strategy):
-        opponent.score = 0
+      self._start_match(opponent)
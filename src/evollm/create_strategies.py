@@ -10,7 +10,7 @@ import anthropic
 import axelrod as axl
 import openai
 
-from evollm import algorithms, common, prompts
+from evollm import algorithms, common, prompts, rewrite
 from evollm.common import Attitude
 
 # Configure logging
@@ -152,7 +152,7 @@ def add_indent(text: str) -> str:
 
 def generate_algorithm(client: openai.OpenAI | anthropic.Anthropic,
                        strategy: str, game: axl.Game, rounds: int,
-                       noise: float, refine: bool=False) -> str:
+                       noise: float, refine: bool=False, incremental: bool=False) -> str:
 
   system = "You are an AI assistant with expertise in game theory and programming. Your task is to implement the strategy description provided by the user as an algorithm."
   prompt = prompts.create_algorithm_prompt(strategy, game, rounds, noise)
@@ -182,6 +182,8 @@ def generate_algorithm(client: openai.OpenAI | anthropic.Anthropic,
   algorithm = strip_code_markers(response)
   algorithm = fix_common_mistakes(algorithm)
   test_algorithm(algorithm)
+  if incremental:
+    algorithm = rewrite.rewrite_algorithm(algorithm)
   algorithm = add_indent(algorithm)
   return algorithm
 
@@ -211,10 +213,10 @@ class {attitude}_{n}(LLM_Strategy):
 {algorithm}"""
 
 
-def generate_class(text_file: TextIOWrapper, strategy_client: openai.OpenAI | anthropic.Anthropic, algorithm_client: openai.OpenAI | anthropic.Anthropic, attitude: Attitude, n: int, temp: float, game: axl.Game, rounds: int, noise: float, refine: bool=False, prose: bool=False):
+def generate_class(text_file: TextIOWrapper, strategy_client: openai.OpenAI | anthropic.Anthropic, algorithm_client: openai.OpenAI | anthropic.Anthropic, attitude: Attitude, n: int, temp: float, game: axl.Game, rounds: int, noise: float, refine: bool=False, prose: bool=False, incremental: bool=False):
   initial_strategy, strategy = generate_strategies(strategy_client, attitude, temp, game, rounds, noise, refine=refine, prose=prose)
 
-  algorithm = generate_algorithm(algorithm_client, strategy, game, rounds, noise, refine=False)
+  algorithm = generate_algorithm(algorithm_client, strategy, game, rounds, noise, refine=False, incremental=incremental)
 
   text_file.write("\n\n" + write_class(initial_strategy, strategy, attitude, n, game, rounds, noise, algorithm))
 
@@ -315,6 +317,10 @@ def parse_arguments() -> argparse.Namespace:
       "--prose",
       action="store_true",
       help="Whether to obfuscate that the strategy is for IPD.")
+  parser.add_argument(
+      "--incremental",
+      action="store_true",
+      help="Rewrite history slicing onto the incremental history statistics (drops comments).")
 
   return parser.parse_args()
 
@@ -342,7 +348,7 @@ from evollm.common import Attitude, auto_update_score, LLM_Strategy""")
 
   with open(f"{args.algo}.py", "a", encoding="utf8") as f:
     for a, n in strategies_to_create:
-      generate_class(f, strategy_client, algorithm_client, a, n, args.temp, game, args.rounds, args.noise, args.refine, args.prose)
+      generate_class(f, strategy_client, algorithm_client, a, n, args.temp, game, args.rounds, args.noise, args.refine, args.prose, args.incremental)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""Replicator dynamics and Wright-Fisher generations on a payoff matrix between types.
+
+Both use the payoffs[x, y] between types computed once, like moran.MatrixMoranProcess, and are
+vectorised over initial points or replicates. The replicator dynamics is the deterministic, infinite
+population limit: dx_i/dt = x_i ((A x)_i - x.A x) on the simplex. A Wright-Fisher generation
+replaces the whole population of N at once by a multinomial draw, each individual being born from
+type x with probability proportional to n_x f_x, with the fitness f_x of the Moran process.
+"""
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+
+def replicator_velocity(payoffs: np.ndarray, x: np.ndarray) -> np.ndarray:
+  """dx/dt of the replicator dynamics at each row of x."""
+  fitness = x @ payoffs.T
+  return x * (fitness - (x * fitness).sum(axis=-1, keepdims=True))
+
+
+def replicator(payoffs, x0, time: float = 50, steps: int = 1000) -> np.ndarray:
+  """Trajectories of the replicator dynamics from each row of x0, as steps + 1 x P x K.
+
+  Integrated with fourth order Runge-Kutta, projecting back onto the simplex after every step.
+  """
+  payoffs = np.asarray(payoffs, dtype=float)
+  x = np.atleast_2d(np.asarray(x0, dtype=float))
+  x = x / x.sum(axis=1, keepdims=True)
+  h = time / steps
+  trajectory = [x]
+  for _ in range(steps):
+    k1 = replicator_velocity(payoffs, x)
+    k2 = replicator_velocity(payoffs, x + h / 2 * k1)
+    k3 = replicator_velocity(payoffs, x + h / 2 * k2)
+    k4 = replicator_velocity(payoffs, x + h * k3)
+    x = np.clip(x + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4), 0, None)
+    x = x / x.sum(axis=1, keepdims=True)
+    trajectory.append(x)
+  return np.array(trajectory)
+
+
+def wright_fisher(payoffs, initial: list[int], replicates: int, seed: int | np.random.SeedSequence | None = None,
+                  max_generations: int = 100_000) -> tuple[np.ndarray, np.ndarray]:
+  """Winning type and number of generations to fixation of each replicate.
+
+  The replicates are drawn together from one generator; the winner of those that haven't fixated
+  after max_generations is -1.
+  """
+  payoffs = np.asarray(payoffs, dtype=float)
+  population_size = int(sum(initial))
+  random = np.random.default_rng(seed)
+  replicate_indices = np.arange(replicates)
+  counts = np.tile(np.asarray(initial, dtype=np.int64), (replicates, 1))
+  winners = np.full(replicates, -1)
+  generations = np.full(replicates, max_generations)
+  for generation in range(max_generations + 1):
+    fixated = counts.max(axis=1) == population_size
+    winners[replicate_indices[fixated]] = counts[fixated].argmax(axis=1)
+    generations[replicate_indices[fixated]] = generation
+    replicate_indices, counts = replicate_indices[~fixated], counts[~fixated]
+    if not len(counts) or generation == max_generations:
+      break
+    births = counts * (counts @ payoffs.T - np.diag(payoffs))
+    total = births.sum(axis=1, keepdims=True)
+    # As MatrixMoranProcess, fall back to uniform births if every fitness is zero
+    births = np.where(total > 0, births / np.where(total > 0, total, 1), counts / population_size)
+    counts = random.multinomial(population_size, births)
+  return winners, generations
+
+
+def simplex(points: np.ndarray) -> np.ndarray:
+  """2D coordinates of points of the 3-type simplex, the types at the corners of a triangle."""
+  return points @ np.array([[0, 0], [1, 0], [0.5, np.sqrt(3) / 2]])
+
+
+def phase_portrait(payoffs, names: list[str], start=None, resolution: int = 15,
+                   ax: plt.Axes | None = None) -> plt.Axes:
+  """Replicator flow over the simplex of three types, with the trajectory from start if given."""
+  payoffs = np.asarray(payoffs, dtype=float)
+  assert payoffs.shape == (3, 3), "The phase portrait is drawn on the simplex of three types"
+  if ax is None:
+    _, ax = plt.subplots()
+  grid = np.array([(i, j, resolution - i - j) for i in range(1, resolution)
+                   for j in range(1, resolution - i)]) / resolution
+  velocity = replicator_velocity(payoffs, grid)
+  origins, directions = simplex(grid), velocity @ np.array([[0, 0], [1, 0], [0.5, np.sqrt(3) / 2]])
+  speed = np.linalg.norm(directions, axis=1)
+  directions = directions / np.where(speed > 0, speed, 1)[:, None]
+  ax.quiver(*origins.T, *directions.T, speed, angles="xy", pivot="mid", cmap="viridis", width=0.004)
+
+  corners = simplex(np.eye(3))
+  ax.plot(*np.vstack([corners, corners[:1]]).T, color="black", linewidth=0.8)
+  for corner, name, alignment in zip(corners, names, ["right", "left", "center"]):
+    ax.annotate(name, corner, ha=alignment, va="top" if corner[1] == 0 else "bottom", fontsize=8)
+  if start is not None:
+    trajectory = simplex(replicator(payoffs, start)[:, 0])
+    ax.plot(*trajectory.T, color="red", linewidth=1)
+    ax.plot(*trajectory[0], "o", color="red", markersize=3)
+  ax.set_aspect("equal")
+  ax.axis("off")
+  return ax
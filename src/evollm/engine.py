@@ -0,0 +1,218 @@
+"""Fast match engine for LLM_Strategy players and the classic axelrod opponents.
+
+play_match produces the same interactions as axl.Match for the same seed: the players are reset
+and seeded from the match random generator in the same order, and the noise flips are drawn from
+the same stream, two per turn. The per-turn work is cut down by drawing all noise flips at once,
+scoring LLM_Strategy players directly instead of through auto_update_score, appending to the
+histories directly, and computing the moves of the classic Beaufils opponents inline from running
+state rather than from their histories.
+"""
+
+import argparse
+
+import axelrod as axl
+import axelrod.tournament
+
+from evollm import common, match_cache
+
+C, D = axl.Action.C, axl.Action.D
+
+
+def _grudger(player):
+  grudge = False
+
+  def strategy(turn, own, other):
+    nonlocal grudge
+    grudge = grudge or other == D
+    return D if grudge else C
+  return strategy
+
+
+def _cycler(cycle):
+  def strategy(turn, own, other):
+    return cycle[turn % len(cycle)]
+  return strategy
+
+
+def _go_by_majority(player):
+  # Only the soft form over the whole history keeps running counts
+  if player.memory or not player.soft:
+    return None
+  defections = 0
+
+  def strategy(turn, own, other):
+    nonlocal defections
+    defections += other is D
+    return D if 2 * defections > turn else C
+  return strategy
+
+
+def _prober(player):
+  opening = []
+
+  def strategy(turn, own, other):
+    if 0 < turn <= 3:
+      opening.append(other)
+    if turn < 3:
+      return (D, C, C)[turn]
+    # Exploit an opponent that cooperated on moves 1 and 2, otherwise tit for tat
+    if opening[1:] == [C, C]:
+      return D
+    return D if other is D else C
+  return strategy
+
+
+def _random(player):
+  # Bound once the match has seeded the player
+  choice, p = player._random.random_choice, player.p
+  return lambda turn, own, other: choice(p)
+
+
+# Exact classes whose moves only depend on the turn and the rounds so far, given to them one at a time.
+# Each factory takes the prepared player and returns strategy(turn, own_last, opponent_last), with None
+# as the last moves of turn 0, or None if the player's parameters aren't supported.
+INLINE_STRATEGIES = {
+    axl.Cooperator: lambda player: lambda turn, own, other: C,
+    axl.Defector: lambda player: lambda turn, own, other: D,
+    axl.TitForTat: lambda player: lambda turn, own, other: D if other is D else C,
+    axl.SuspiciousTitForTat: lambda player: lambda turn, own, other: C if other is C else D,
+    axl.WinStayLoseShift: lambda player: lambda turn, own, other: C if turn == 0 or own is other else D,
+    axl.Grudger: _grudger,
+    axl.CyclerCCD: lambda player: _cycler((C, C, D)),
+    axl.CyclerDDC: lambda player: _cycler((D, D, C)),
+    axl.GoByMajority: _go_by_majority,
+    axl.Prober: _prober,
+    axl.Random: _random,
+}
+
+
+def supports(match: axl.Match) -> bool:
+  """Whether the fast engine reproduces this match; otherwise use axl.Match.play."""
+  return not match.prob_end and len(match.players) == 2
+
+
+def _prepare(match: axl.Match) -> None:
+  # As axl.Match.play
+  for p in match.players:
+    if match.reset:
+      p.reset()
+    p.set_match_attributes(**match.match_attributes)
+    if axl.Classifiers["stochastic"](p):
+      p.set_seed(match._random.random_seed_int())
+
+
+def _inline(player: axl.Player):
+  factory = INLINE_STRATEGIES.get(type(player))
+  return factory(player) if factory else None
+
+
+def _strategy(player: axl.Player):
+  """The strategy of the player, skipping auto_update_score since the engine scores the rounds."""
+  scored = getattr(type(player).strategy, "scored_strategy", None)
+  return scored.__get__(player) if scored else player.strategy
+
+
+def _history_append(player: axl.Player):
+  """Append to the player's history, as update_history does unless the player overrides it."""
+  if type(player).update_history is axl.Player.update_history:
+    return player._history.append
+  return player.update_history
+
+
+def run(match: axl.Match) -> list[tuple[axl.Action, axl.Action]]:
+  """Play a configured axl.Match and store its result, as match.play() would."""
+  p1, p2 = match.players
+  turns = match.turns
+  game = match.game
+  _prepare(match)
+
+  llm1 = isinstance(p1, common.LLM_Strategy)
+  llm2 = isinstance(p2, common.LLM_Strategy)
+  llm_players = [p for p, llm in [(p1, llm1), (p2, llm2)] if llm]
+  # Before binding the histories, since this gives the opponents of LLM_Strategy an ActionHistory
+  if llm1:
+    p1._start_match(p2)
+  if llm2:
+    p2._start_match(p1)
+  inline1, inline2 = _inline(p1), _inline(p2)
+  strategy1, strategy2 = _strategy(p1), _strategy(p2)
+  update1, update2 = _history_append(p1), _history_append(p2)
+  score1 = p1._score_round if llm1 else None
+  score2 = p2._score_round if llm2 else None
+
+  noise = match.noise
+  flips = match._random.random(2 * turns).tolist() if noise else []
+
+  result = []
+  s1 = s2 = None
+  for p in llm_players:
+    p.externally_scored = True
+  try:
+    for turn in range(turns):
+      # Score the previous round just before each LLM_Strategy moves, as auto_update_score does
+      if score1 and turn:
+        score1(p2, (s1, s2), game)
+      a1 = inline1(turn, s1, s2) if inline1 else strategy1(p2)
+      if score2 and turn:
+        score2(p1, (s2, s1), game)
+      a2 = inline2(turn, s2, s1) if inline2 else strategy2(p1)
+
+      if noise:
+        if flips[2 * turn] < noise:
+          a1 = a1.flip()
+        if flips[2 * turn + 1] < noise:
+          a2 = a2.flip()
+      s1, s2 = a1, a2
+      update1(s1, s2)
+      update2(s2, s1)
+      result.append((s1, s2))
+  finally:
+    for p in llm_players:
+      p.externally_scored = False
+
+  match.result = result
+  return result
+
+
+class FastMatch(axl.Match):
+  """axl.Match that plays through the fast engine when it can."""
+
+  def play(self) -> list[tuple[axl.Action, axl.Action]]:
+    if not supports(self) or not self._stochastic:
+      # Deterministic matches go through axelrod's cache
+      return super().play()
+    return run(self)
+
+
+def play_match(p1: axl.Player, p2: axl.Player, game: axl.Game, turns: int, noise: float = 0,
+               seed: int | None = None) -> axl.Match:
+  """Play a single match with the fast engine, returning the played axl.Match."""
+  match = axl.Match((p1, p2), turns=turns, game=game, noise=noise, seed=seed)
+  run(match)
+  return match
+
+
+# The match class set by install, for code that builds its own matches
+Match: type[axl.Match] = axl.Match
+
+
+def install(match_class: type[axl.Match] = FastMatch) -> None:
+  """Make axl.Tournament and engine.Match play matches with match_class.
+
+  axl.MoranProcess binds its match class when it is defined, so pass it match_class=engine.Match.
+  """
+  global Match
+  Match = match_class
+  axelrod.tournament.Match = match_class
+
+
+def install_args(args: argparse.Namespace) -> type[axl.Match]:
+  """Install the match class selected by --fast and --cache, and return it.
+
+  Only this process is patched: axl.Tournament workers are spawned and play the stock axl.Match.
+  """
+  match_class = FastMatch if args.fast else axl.Match
+  if args.cache:
+    match_class = match_cache.cached(match_class, match_cache.MatchCache(args.cache, args.cache_entries))
+  install(match_class)
+  return match_class
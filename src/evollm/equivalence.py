@@ -0,0 +1,169 @@
+"""Check that the fast execution paths reproduce axl.Match bit for bit.
+
+Every strategy of every module is played against the Beaufils opponents and against itself, for
+each seed, once through axl.Match with the original classes (the reference) and once per variant:
+  engine          original classes, evollm.engine
+  rewrite         classes compiled by evollm.rewrite, axl.Match
+  rewrite+engine  both
+and the first turn at which a variant's interactions differ from the reference is reported. A match
+that raises is compared by the exception and the turn it was raised at, so strategies that fail the
+same way on every path don't diverge.
+"""
+
+import argparse
+import functools
+import glob
+import os
+from multiprocessing import Pool
+from typing import NamedTuple
+
+import axelrod as axl
+
+from evollm import algorithms, common, engine
+
+VARIANTS = ("engine", "rewrite", "rewrite+engine")
+
+
+class Divergence(NamedTuple):
+  module: str
+  strategy: str
+  opponent: str
+  seed: int
+  variant: str
+  turn: int
+  error: str = ""
+
+
+class Failure(NamedTuple):
+  """Exception raised by a match, at the turn it was raised."""
+  error: str
+  turn: int
+
+
+def first_divergence(a: list, b: list) -> int | None:
+  """Index of the first turn at which two interaction lists differ, or None if identical."""
+  for turn, (x, y) in enumerate(zip(a, b)):
+    if x != y:
+      return turn
+  if len(a) != len(b):
+    return min(len(a), len(b))
+  return None
+
+
+@functools.cache
+def _strategies(module_path: str, rewrite: bool) -> dict[str, type[common.LLM_Strategy]]:
+  # Each worker loads a module at most once per form
+  return {a.__name__: a for a in algorithms.load_algorithms(module_path, rewrite=rewrite)}
+
+
+def _play(cls: type[common.LLM_Strategy], opponent: type[axl.Player] | None, turns: int, seed: int,
+          fast: bool) -> list[tuple[axl.Action, axl.Action]] | Failure:
+  coplayer = cls() if opponent is None else opponent()
+  match = axl.Match((cls(), coplayer), turns=turns, game=common.get_game(cls.game), noise=cls.noise, seed=seed)
+  try:
+    return engine.run(match) if fast else match.play()
+  except Exception as e:
+    return Failure(f"{type(e).__name__}: {e}", len(match.players[0].history))
+
+
+def compare(reference: list | Failure, result: list | Failure) -> tuple[int, str] | None:
+  """Turn and description of the divergence of a result from the reference, or None if they agree."""
+  if not isinstance(reference, Failure) and not isinstance(result, Failure):
+    turn = first_divergence(reference, result)
+    return None if turn is None else (turn, "")
+  if reference == result:
+    return None
+  turn = min(r.turn for r in (reference, result) if isinstance(r, Failure))
+  errors = [r.error if isinstance(r, Failure) else "no error" for r in (reference, result)]
+  return turn, " vs ".join(errors)
+
+
+def check_strategy(module_path: str, name: str, variants: tuple[str, ...], seeds: tuple[int, ...],
+                   turns: int | None = None) -> list[Divergence]:
+  """Compare every variant of one strategy against the reference, returning the divergences."""
+  original = _strategies(module_path, False)[name]
+  rewritten = _strategies(module_path, True)[name] if any("rewrite" in v for v in variants) else original
+  length = turns or original.rounds
+  divergences = []
+
+  for opponent in common.BEAUFILS_OPPONENTS + [None]:
+    opponent_name = name if opponent is None else opponent.__name__
+    for seed in seeds:
+      reference = _play(original, opponent, length, seed, fast=False)
+      for variant in variants:
+        cls = rewritten if "rewrite" in variant else original
+        divergence = compare(reference, _play(cls, opponent, length, seed, fast="engine" in variant))
+        if divergence is not None:
+          divergences.append(Divergence(module_path, name, opponent_name, seed, variant, *divergence))
+  return divergences
+
+
+def _check_task(task: tuple) -> list[Divergence]:
+  return check_strategy(*task)
+
+
+def check_modules(module_paths: list[str], variants: tuple[str, ...] = VARIANTS, seeds: tuple[int, ...] = (1,),
+                  turns: int | None = None, processes: int = 1) -> list[Divergence]:
+  """Check every strategy of every module, spread over a process pool."""
+  tasks = [(path, name, tuple(variants), tuple(seeds), turns)
+           for path in module_paths for name in _strategies(path, False)]
+  divergences = []
+
+  def collect(result: list[Divergence]) -> None:
+    for d in result:
+      error = f": {d.error}" if d.error else ""
+      print(f"{d.module} {d.strategy} vs {d.opponent} (seed {d.seed}, {d.variant}) diverges at turn {d.turn}{error}")
+    divergences.extend(result)
+
+  if processes > 1:
+    with Pool(processes=processes) as pool:
+      for result in pool.imap_unordered(_check_task, tasks, chunksize=max(1, len(tasks) // (8 * processes))):
+        collect(result)
+  else:
+    for task in tasks:
+      collect(_check_task(task))
+
+  return sorted(divergences)
+
+
+def parse_arguments() -> argparse.Namespace:
+  """Parse command line arguments."""
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument(
+      "--algos",
+      nargs="+",
+      type=str,
+      default=sorted(glob.glob(os.path.join("strategies", "*.py"))),
+      help="Python modules with the LLM algorithms (default: all of strategies/)")
+  parser.add_argument(
+      "--variants",
+      nargs="+",
+      choices=VARIANTS,
+      default=list(VARIANTS),
+      help="Execution paths to compare against axl.Match")
+  parser.add_argument(
+      "--seeds",
+      nargs="+",
+      type=int,
+      default=[1],
+      help="Match seeds")
+  parser.add_argument(
+      "--turns",
+      type=common.positive_int,
+      help="Number of turns per match (default: the rounds of each strategy)")
+  parser.add_argument(
+      "--processes",
+      type=common.positive_int,
+      default=os.cpu_count(),
+      help="Number of processes to run simultaneously")
+
+  return parser.parse_args()
+
+
+if __name__ == "__main__":
+  parsed_args = parse_arguments()
+
+  divergences = check_modules(parsed_args.algos, tuple(parsed_args.variants), tuple(parsed_args.seeds),
+                              parsed_args.turns, parsed_args.processes)
+  print(f"{len(divergences)} diverging matches")
@@ -0,0 +1,62 @@
+"""Fenwick tree of non-negative weights for O(log n) updates and proportional sampling."""
+
+
+class FenwickTree:
+  """Weights w[0..n) with O(log n) point updates, prefix sums and weighted sampling."""
+
+  def __init__(self, weights) -> None:
+    self._weights = list(weights)
+    n = len(self._weights)
+    # _tree[i] is the sum of the weights in (i - lowbit(i), i], 1-based
+    self._tree = [0] + self._weights
+    for i in range(1, n + 1):
+      parent = i + (i & -i)
+      if parent <= n:
+        self._tree[parent] += self._tree[i]
+    self._top = 1 << (n.bit_length() - 1) if n else 0
+
+  def __len__(self) -> int:
+    return len(self._weights)
+
+  def __getitem__(self, i: int):
+    return self._weights[i]
+
+  def __setitem__(self, i: int, weight) -> None:
+    self.add(i, weight - self._weights[i])
+
+  def add(self, i: int, delta) -> None:
+    self._weights[i] += delta
+    i += 1
+    while i < len(self._tree):
+      self._tree[i] += delta
+      i += i & -i
+
+  def prefix(self, stop: int):
+    """Sum of the weights before index stop."""
+    total = 0
+    while stop > 0:
+      total += self._tree[stop]
+      stop -= stop & -stop
+    return total
+
+  def total(self):
+    return self.prefix(len(self._weights))
+
+  def find(self, value) -> int:
+    """Smallest index i such that the sum of the weights up to and including i exceeds value."""
+    i = 0
+    step = self._top
+    while step:
+      j = i + step
+      if j < len(self._tree) and self._tree[j] <= value:
+        i = j
+        value -= self._tree[j]
+      step >>= 1
+    return i
+
+  def sample(self, random: float) -> int:
+    """Index drawn proportionally to the weights, from a uniform random number in [0, 1)."""
+    total = self.total()
+    # Integer weights are sampled exactly, float ones may round up to the total
+    value = int(random * total) if isinstance(total, int) else random * total
+    return min(self.find(value), len(self._weights) - 1)
@@ -0,0 +1,87 @@
+"""Exact fixation probabilities and absorption times of the matrix Moran process.
+
+The birth-death process of moran.MatrixMoranProcess is a Markov chain on the compositions of the
+population, i.e. the counts of each type summing to the population size N. The compositions where
+a single type remains are absorbing; for the others, the fixation probabilities B and the mean
+number of steps to absorption t solve the sparse systems (I - Q) B = R and (I - Q) t = 1, with Q
+the transitions between transient compositions and R those into the absorbing ones. With three
+types there are (N + 1)(N + 2) / 2 compositions, so N in the hundreds solves in seconds.
+"""
+
+import itertools
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+
+def compositions(population_size: int, types: int) -> np.ndarray:
+  """All compositions of population_size individuals into types, in lexicographic order."""
+  # Stars and bars: choose the positions of the types - 1 bars among population_size + types - 1
+  bars = np.array(list(itertools.combinations(range(population_size + types - 1), types - 1)), dtype=np.int64)
+  bars = bars.reshape(-1, types - 1)
+  edges = np.hstack([np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), population_size + types - 1)])
+  return np.diff(edges, axis=1) - 1
+
+
+def transition_matrix(payoffs: np.ndarray, states: np.ndarray) -> scipy.sparse.csr_matrix:
+  """Transition probabilities between the compositions of one step of the birth-death process."""
+  n_states, types = states.shape
+  population_size = int(states[0].sum())
+  fitness = states @ payoffs.T - np.diag(payoffs)
+  births = states * fitness
+  total = births.sum(axis=1, keepdims=True)
+  # As MatrixMoranProcess, fall back to uniform births if every fitness is zero
+  births = np.where(total > 0, births / np.where(total > 0, total, 1), states / population_size)
+  deaths = states / population_size
+
+  # States are in lexicographic order, so their codes are sorted
+  radix = (population_size + 1) ** np.arange(types - 1, -1, -1)
+  codes = states @ radix
+  rows, columns, values = [np.arange(n_states)], [np.arange(n_states)], [np.ones(n_states)]
+  for birth, death in itertools.permutations(range(types), 2):
+    p = births[:, birth] * deaths[:, death]
+    moving = np.flatnonzero(p > 0)
+    target = np.searchsorted(codes, codes[moving] + radix[birth] - radix[death])
+    rows += [moving, moving]
+    columns += [target, moving]
+    values += [p[moving], -p[moving]]
+  return scipy.sparse.csr_matrix(
+      (np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))), shape=(n_states, n_states))
+
+
+def solve(payoffs, population_size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Fixation probabilities and mean absorption times from every composition.
+
+  payoffs[x, y] is the expected payoff per turn of type x against type y, as a square array or a
+  DataFrame like head_to_head.analyse_by_genome returns. Returns the compositions (S x K), the
+  probability that each type fixates from each of them (S x K) and the mean number of steps until
+  one type fixates (S).
+  """
+  if hasattr(payoffs, "loc"):
+    payoffs = payoffs.loc[:, payoffs.index]
+  payoffs = np.asarray(payoffs, dtype=float)
+  types = len(payoffs)
+  states = compositions(population_size, types)
+  transitions = transition_matrix(payoffs, states)
+
+  absorbing = states.max(axis=1) == population_size
+  transient = np.flatnonzero(~absorbing)
+  absorbing = np.flatnonzero(absorbing)
+  probabilities = np.zeros((len(states), types))
+  probabilities[absorbing, states[absorbing].argmax(axis=1)] = 1
+  times = np.zeros(len(states))
+  if len(transient):
+    q = transitions[transient][:, transient]
+    r = transitions[transient][:, absorbing] @ probabilities[absorbing]
+    lu = scipy.sparse.linalg.splu((scipy.sparse.identity(len(transient), format="csc") - q).tocsc())
+    probabilities[transient] = lu.solve(np.asarray(r))
+    times[transient] = lu.solve(np.ones(len(transient)))
+  return states, probabilities, times
+
+
+def fixation(payoffs, initial: list[int]) -> tuple[np.ndarray, float]:
+  """Probability that each type fixates and mean number of steps to fixation from initial."""
+  states, probabilities, times = solve(payoffs, int(sum(initial)))
+  index = np.flatnonzero((states == np.asarray(initial)).all(axis=1))[0]
+  return probabilities[index], float(times[index])
@@ -0,0 +1,81 @@
+"""Interaction graphs for the spatial Moran process, as sparse adjacency matrices.
+
+Graphs are undirected and without loops, as symmetric scipy CSR matrices whose row i lists the
+neighbours of node i in indices[indptr[i]:indptr[i + 1]].
+"""
+
+import numpy as np
+import scipy.sparse
+
+
+def from_edges(nodes: int, sources, targets) -> scipy.sparse.csr_matrix:
+  """Symmetric adjacency matrix of the edges, dropping loops and duplicates."""
+  sources, targets = np.asarray(sources), np.asarray(targets)
+  keep = sources != targets
+  sources, targets = sources[keep], targets[keep]
+  adjacency = scipy.sparse.coo_matrix(
+      (np.ones(2 * len(sources), dtype=np.int8), (np.concatenate([sources, targets]), np.concatenate([targets, sources]))),
+      shape=(nodes, nodes)).tocsr()
+  adjacency.data[:] = 1
+  adjacency.sort_indices()
+  return adjacency
+
+
+def lattice(side: int) -> scipy.sparse.csr_matrix:
+  """Square lattice of side x side nodes on a torus, each with its 4 nearest neighbours."""
+  nodes = np.arange(side * side).reshape(side, side)
+  right, down = np.roll(nodes, -1, axis=1), np.roll(nodes, -1, axis=0)
+  return from_edges(side * side, np.concatenate([nodes.ravel()] * 2), np.concatenate([right.ravel(), down.ravel()]))
+
+
+def small_world(nodes: int, neighbours: int = 4, rewiring: float = 0.1,
+                seed: int | np.random.Generator | None = None) -> scipy.sparse.csr_matrix:
+  """Watts-Strogatz graph of nodes on a ring, each linked to its neighbours nearest nodes.
+
+  Each edge is rewired to a uniformly chosen node with probability rewiring.
+  """
+  assert neighbours % 2 == 0 and neighbours < nodes, "neighbours must be even and less than nodes"
+  random = np.random.default_rng(seed)
+  sources = np.repeat(np.arange(nodes), neighbours // 2)
+  targets = (sources + np.tile(np.arange(1, neighbours // 2 + 1), nodes)) % nodes
+  rewired = random.random(len(targets)) < rewiring
+  targets[rewired] = random.integers(nodes, size=rewired.sum())
+  return from_edges(nodes, sources, targets)
+
+
+def scale_free(nodes: int, edges: int = 2,
+               seed: int | np.random.Generator | None = None) -> scipy.sparse.csr_matrix:
+  """Barabasi-Albert graph, where each new node links to edges distinct nodes.
+
+  The nodes are chosen proportionally to their degree, starting from a star on edges + 1 nodes.
+  """
+  assert 0 < edges < nodes, "edges must be between 0 and nodes"
+  random = np.random.default_rng(seed)
+  sources, targets = [0] * edges, list(range(1, edges + 1))
+  # Every node appears once per incident edge, so a uniform entry is drawn proportionally to degree
+  ends = sources + targets
+  for node in range(edges + 1, nodes):
+    chosen: set[int] = set()
+    while len(chosen) < edges:
+      chosen.add(ends[random.integers(len(ends))])
+    for target in chosen:
+      sources.append(node)
+      targets.append(target)
+      ends += [node, target]
+  return from_edges(nodes, sources, targets)
+
+
+KINDS = ["lattice", "small_world", "scale_free"]
+
+
+def create(kind: str, nodes: int, seed: int | np.random.Generator | None = None) -> scipy.sparse.csr_matrix:
+  """Graph of one of KINDS with default parameters; a lattice needs a square number of nodes."""
+  if kind == "lattice":
+    side = int(np.sqrt(nodes))
+    assert side * side == nodes, f"A lattice can't have {nodes} nodes"
+    return lattice(side)
+  if kind == "small_world":
+    return small_world(nodes, seed=seed)
+  if kind == "scale_free":
+    return scale_free(nodes, seed=seed)
+  raise ValueError(f"Unknown graph {kind}, not one of {KINDS}")
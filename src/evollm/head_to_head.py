@@ -10,6 +10,7 @@ import pandas as pd
 
 from evollm import algorithms
 from evollm import common
+from evollm import engine
 
 
 def analyse_by_genome(data: list[list[int | float]], players: list[axl.Player]) -> pd.DataFrame:
@@ -45,6 +46,28 @@ def parse_arguments() -> argparse.Namespace:
       type=str,
       required=True,
       help="Name of the python module with the LLM algorithms")
+  parser.add_argument(
+      "--rewrite",
+      action="store_true",
+      help="Rewrite history slicing in the strategies onto incremental statistics when loading")
+  parser.add_argument(
+      "--fast",
+      action="store_true",
+      help="Play matches with the fast match engine")
+  parser.add_argument(
+      "--cache",
+      type=str,
+      help="SQLite file caching the interactions of every match played, across runs")
+  parser.add_argument(
+      "--cache_entries",
+      type=common.positive_int,
+      default=1_000_000,
+      help="Maximum number of matches kept in the cache")
+  parser.add_argument(
+      "--seed",
+      type=int,
+      default=1,
+      help="Seed of the tournaments")
   parser.add_argument(
       "--keep_top",
       type=common.temp_arg,
@@ -63,7 +86,8 @@ def parse_arguments() -> argparse.Namespace:
   return parser.parse_args()
 
 
-def play_vs_llm_strats(file_name: str, algos: list[type[common.LLM_Strategy]]) -> None:
+def play_vs_llm_strats(file_name: str, algos: list[type[common.LLM_Strategy]], seed: int = 1,
+                       processes: int | None = 0) -> None:
   players = [a() for a in algos]
   print(f"Players: {players}")
 
@@ -73,9 +97,10 @@ def play_vs_llm_strats(file_name: str, algos: list[type[common.LLM_Strategy]]) -
     turns=algos[0].rounds,
     repetitions=20,
     noise=algos[0].noise,
+    seed=seed,
   )
 
-  results = tournament.play(processes=0, filename=f"results/{file_name}_results_full.txt")
+  results = tournament.play(processes=processes, filename=f"results/{file_name}_results_full.txt")
 
   normalised_cooperation = analyse_by_genome(results.normalised_cooperation, players)
   print("Normalised cooperation\n", normalised_cooperation)
@@ -89,22 +114,9 @@ def play_vs_llm_strats(file_name: str, algos: list[type[common.LLM_Strategy]]) -
     f.write(f"\nResults Summary:\n{df.to_string()}")
 
 
-def play_beaufils(file_name: str, algos:list[type[common.LLM_Strategy]]) -> None:
-  classes = [axl.Cooperator,
-          axl.Defector,
-          axl.Random,
-          axl.TitForTat,
-          axl.Grudger,
-          axl.CyclerDDC,
-          axl.CyclerCCD,
-          axl.GoByMajority,
-          axl.SuspiciousTitForTat,
-          axl.Prober,
-          # axl.OriginalGradual,
-          axl.WinStayLoseShift,
-          ]
-
-  players = [c() for c in classes]
+def play_beaufils(file_name: str, algos:list[type[common.LLM_Strategy]], seed: int = 1,
+                  processes: int | None = 0) -> None:
+  players = [c() for c in common.BEAUFILS_OPPONENTS]
 
   Aggressive, Cooperative, Neutral = algorithms.create_classes(algos)
   tournament = axl.Tournament(players + [Aggressive(), Cooperative(), Neutral()],
@@ -112,8 +124,8 @@ def play_beaufils(file_name: str, algos:list[type[common.LLM_Strategy]]) -> None
                               turns=algos[0].rounds,
                               repetitions=200,
                               noise=algos[0].noise,
-                              seed=1)
-  results = tournament.play(processes=0)
+                              seed=seed)
+  results = tournament.play(processes=processes)
 
   df = pd.DataFrame(results.summarise()).set_index("Rank", drop=True)
   print(df)
@@ -140,9 +152,13 @@ def play_beaufils(file_name: str, algos:list[type[common.LLM_Strategy]]) -> None
 if __name__ == "__main__":
   parsed_args = parse_arguments()
 
-  algos = algorithms.load_algorithms(parsed_args.algo, parsed_args.keep_top, parsed_args.keep_bottom)
+  engine.install_args(parsed_args)
+  # Spawned tournament workers play the stock axl.Match, so play serially with the installed one
+  processes = None if parsed_args.fast or parsed_args.cache else 0
+
+  algos = algorithms.load_algorithms(parsed_args.algo, parsed_args.keep_top, parsed_args.keep_bottom, parsed_args.rewrite)
 
   if parsed_args.h2h:
-    play_vs_llm_strats(parsed_args.algo, algos)
+    play_vs_llm_strats(parsed_args.algo, algos, parsed_args.seed, processes)
   else:
-    play_beaufils(parsed_args.algo, algos)
+    play_beaufils(parsed_args.algo, algos, parsed_args.seed, processes)
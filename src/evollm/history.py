@@ -0,0 +1,226 @@
+import operator
+from collections import Counter
+
+import axelrod as axl
+
+# Actions indexed by their value, as stored in ActionHistory
+ACTIONS = tuple(sorted(axl.Action, key=lambda a: a.value))
+_C, _D = axl.Action.C, axl.Action.D
+
+
+class HistoryStats:
+  """Running action counts for one player, extended once per round.
+
+  Counts over any slice of the history are answered in O(1) from a prefix count
+  of defections, instead of slicing and counting the history every move.
+  """
+
+  def __init__(self) -> None:
+    # _defections[t] is the number of defections in the first t rounds
+    self._defections: list[int] = [0]
+    self._last: axl.Action | None = None
+    self._streak: int = 0
+
+  def __len__(self) -> int:
+    return len(self._defections) - 1
+
+  def append(self, action: axl.Action) -> None:
+    defections = self._defections
+    defections.append(defections[-1] + (action is _D))
+    if action is self._last:
+      self._streak += 1
+    else:
+      self._last = action
+      self._streak = 1
+
+  def count(self, action: axl.Action, start: int | None = None, stop: int | None = None) -> int:
+    """Equivalent to history[start:stop].count(action)."""
+    prefix = self._defections
+    start, stop, _ = slice(start, stop).indices(len(prefix) - 1)
+    if stop <= start:
+      return 0
+    defections = prefix[stop] - prefix[start]
+    if action is _D:
+      return defections
+    if action is _C:
+      return stop - start - defections
+    return 0
+
+  def defections(self, start: int | None = None, stop: int | None = None) -> int:
+    return self.count(axl.Action.D, start, stop)
+
+  def cooperations(self, start: int | None = None, stop: int | None = None) -> int:
+    return self.count(axl.Action.C, start, stop)
+
+  def recent_defections(self, n: int) -> int:
+    """Number of defections in the last n rounds."""
+    return self.count(axl.Action.D, -n, None) if n > 0 else 0
+
+  def recent_cooperations(self, n: int) -> int:
+    """Number of cooperations in the last n rounds."""
+    return self.count(axl.Action.C, -n, None) if n > 0 else 0
+
+  def streak(self, action: axl.Action) -> int:
+    """Number of consecutive times action has been played up to the last round."""
+    return self._streak if self._last == action else 0
+
+  def all_equal(self, action: axl.Action, start: int | None = None, stop: int | None = None) -> bool:
+    """Equivalent to all(a == action for a in history[start:stop])."""
+    start, stop, _ = slice(start, stop).indices(len(self))
+    return self.count(action, start, stop) == max(0, stop - start)
+
+  def run_at_least(self, action: axl.Action, k: int) -> bool:
+    """Equivalent to all(history[-i] == action for i in range(1, k + 1)).
+
+    Like the original, this raises IndexError if the whole history matches but is shorter than k.
+    """
+    k = operator.index(k)
+    streak = self.streak(action)
+    if k <= streak:
+      return True
+    if streak == len(self):
+      raise IndexError("list index out of range")
+    return False
+
+
+class HistoryView:
+  """Read-only window onto an ActionHistory, returned by slicing it instead of a new list.
+
+  The underlying buffer is append-only, so a view keeps the contents it had when it was
+  taken, like the list it replaces. It supports what strategies do with slices: len,
+  indexing, iteration, count, in and == against lists.
+  """
+
+  __slots__ = ("_buffer", "_stats", "_start", "_stop")
+
+  def __init__(self, buffer: bytearray, stats: HistoryStats, start: int, stop: int) -> None:
+    self._buffer = buffer
+    self._stats = stats
+    self._start = start
+    self._stop = max(start, stop)
+
+  def __len__(self) -> int:
+    return self._stop - self._start
+
+  def __getitem__(self, key):
+    if isinstance(key, slice):
+      start, stop, step = key.indices(len(self))
+      if step != 1:
+        return list(self)[key]
+      return HistoryView(self._buffer, self._stats, self._start + start, self._start + stop)
+    index = operator.index(key)
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError("list index out of range")
+    return ACTIONS[self._buffer[self._start + index]]
+
+  def __iter__(self):
+    return map(ACTIONS.__getitem__, self._buffer[self._start:self._stop])
+
+  def __reversed__(self):
+    return reversed(list(self))
+
+  def __contains__(self, action) -> bool:
+    return self.count(action) > 0
+
+  def __eq__(self, other) -> bool:
+    if isinstance(other, HistoryView):
+      return self._buffer[self._start:self._stop] == other._buffer[other._start:other._stop]
+    if isinstance(other, list):
+      return len(other) == len(self) and all(map(operator.eq, self, other))
+    if isinstance(other, axl.History):
+      return other == list(self)
+    return NotImplemented
+
+  def __add__(self, other):
+    if isinstance(other, (list, HistoryView)):
+      return list(self) + list(other)
+    return NotImplemented
+
+  def __radd__(self, other):
+    if isinstance(other, list):
+      return other + list(self)
+    return NotImplemented
+
+  def __mul__(self, n: int) -> list[axl.Action]:
+    return list(self) * n
+
+  __rmul__ = __mul__
+
+  def __repr__(self) -> str:
+    return repr(list(self))
+
+  def count(self, action) -> int:
+    return self._stats.count(action, self._start, self._stop)
+
+  def index(self, action, start: int = 0, stop: int | None = None) -> int:
+    start, stop, _ = slice(start, stop).indices(len(self))
+    if action in ACTIONS:
+      found = self._buffer.find(action.value, self._start + start, self._start + stop)
+      if found >= 0:
+        return found - self._start
+    raise ValueError(f"{action!r} is not in list")
+
+  def copy(self) -> list[axl.Action]:
+    return list(self)
+
+  def window(self, buffer: bytearray) -> tuple[int, int] | None:
+    """(start, stop) of this view if it is a window onto buffer, else None."""
+    return (self._start, self._stop) if buffer is self._buffer else None
+
+
+class ActionHistory(axl.History):
+  """axl.History that also keeps its plays in a compact buffer and slices into HistoryViews.
+
+  The action counts and the state distribution are answered from the buffers rather than kept in
+  Counters every round.
+  """
+
+  def __init__(self, plays=None, coplays=None) -> None:
+    self._buffer = bytearray()
+    self.stats = HistoryStats()
+    super().__init__(plays, coplays)
+
+  def append(self, play: axl.Action, coplay: axl.Action) -> None:
+    self._plays.append(play)
+    self._coplays.append(coplay)
+    self._buffer.append(play is _D)
+    self.stats.append(play)
+
+  def extend(self, plays, coplays) -> None:
+    for play, coplay in zip(plays, coplays):
+      self.append(play, coplay)
+
+  def reset(self) -> None:
+    super().reset()
+    # Fresh storage, so views taken before the reset keep their contents
+    self._buffer = bytearray()
+    self.stats = HistoryStats()
+
+  @property
+  def cooperations(self) -> int:
+    return self.stats.cooperations()
+
+  @property
+  def defections(self) -> int:
+    return self.stats.defections()
+
+  @property
+  def state_distribution(self) -> Counter:
+    return Counter(zip(self._plays, self._coplays))
+
+  def __getitem__(self, key):
+    if isinstance(key, slice):
+      start, stop, step = key.indices(len(self._buffer))
+      if step == 1:
+        return HistoryView(self._buffer, self.stats, start, stop)
+    return super().__getitem__(key)
+
+  def window(self, view) -> tuple[int, int] | None:
+    """(start, stop) of a view or of this whole history within this history, else None."""
+    if view is self:
+      return 0, len(self._buffer)
+    if isinstance(view, HistoryView):
+      return view.window(self._buffer)
+    return None
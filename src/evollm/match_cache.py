@@ -0,0 +1,159 @@
+"""Persistent cache of match interactions, shared by all entry points.
+
+A match is identified by the strategies of both players, the game, turns, noise, match seed, the
+index of the play on that match (a tournament replays the same match for every repetition) and the
+axelrod version. LLM strategies are identified by the normalised source hash from
+algorithms.load_algorithms, so editing a strategy only invalidates its own matches. The cache never
+holds more than max_entries matches: every insertion beyond it evicts the least recently used ones.
+The number of matches is kept in the database by triggers, so the bound holds across processes.
+
+A cache hit advances the match random generator exactly as playing the match would, so the
+matches played after it (and their seeds) are unchanged.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+import axelrod as axl
+
+from evollm import common
+from evollm.history import ACTIONS
+
+# Interactions are stored one byte per turn
+_OUTCOMES = [(a, b) for a in ACTIONS for b in ACTIONS]
+_CODES = {outcome: i for i, outcome in enumerate(_OUTCOMES)}
+
+
+def player_key(player: axl.Player) -> str | None:
+  """Identifier of the strategy a player plays, or None if it cannot be identified."""
+  cls = type(player)
+  if isinstance(player, common.LLM_Strategy):
+    strategies = getattr(cls, "strategies", None)
+    if strategies is not None:
+      # Sampler from algorithms.create_classes: its choice depends on the order of the strategies
+      hashes = [s.source_hash for s in strategies]
+      return None if None in hashes else f"{cls.name}:{','.join(hashes)}"
+    return cls.source_hash
+  return f"{cls.__module__}.{cls.__qualname__}:{player!r}"
+
+
+def match_key(match: axl.Match, play_index: int) -> str | None:
+  """Cache key of a play of a match, or None if the match cannot be cached."""
+  seed = match._random.original_seed
+  if seed is None or match.prob_end or not match.reset or len(match.players) != 2:
+    return None
+  players = [player_key(p) for p in match.players]
+  if None in players:
+    return None
+  key = (*players, match.game.RPST(), match.turns, match.noise, int(seed), play_index, axl.__version__)
+  return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+def encode(interactions: list[tuple[axl.Action, axl.Action]]) -> bytes:
+  return bytes(_CODES[outcome] for outcome in interactions)
+
+
+def decode(data: bytes) -> list[tuple[axl.Action, axl.Action]]:
+  return [_OUTCOMES[code] for code in data]
+
+
+def advance(match: axl.Match) -> None:
+  """Draw from the match random generator what axl.Match.play draws for a fixed-length match."""
+  for p in match.players:
+    if axl.Classifiers["stochastic"](p):
+      match._random.random_seed_int()
+  if match.noise:
+    match._random.random(2 * match.turns)
+
+
+class MatchCache:
+  """On-disk LRU cache of match interactions in an SQLite database."""
+
+  def __init__(self, path: str, max_entries: int = 1_000_000) -> None:
+    self.path = path
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._connection: sqlite3.Connection | None = None
+    self._pid: int | None = None
+
+  @property
+  def connection(self) -> sqlite3.Connection:
+    # Connections can't be shared with forked worker processes
+    if self._connection is None or self._pid != os.getpid():
+      directory = os.path.dirname(self.path)
+      if directory:
+        os.makedirs(directory, exist_ok=True)
+      self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+      self._connection.execute("PRAGMA journal_mode=WAL")
+      self._connection.execute("PRAGMA synchronous=NORMAL")
+      self._connection.execute("BEGIN IMMEDIATE")
+      self._connection.execute(
+          "CREATE TABLE IF NOT EXISTS matches (key TEXT PRIMARY KEY, interactions BLOB, last_access REAL)")
+      self._connection.execute("CREATE INDEX IF NOT EXISTS matches_access ON matches (last_access)")
+      self._connection.execute("CREATE TABLE IF NOT EXISTS entries (n INTEGER)")
+      if self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0] == 0:
+        self._connection.execute("INSERT INTO entries SELECT COUNT(*) FROM matches")
+      self._connection.execute("CREATE TRIGGER IF NOT EXISTS matches_insert AFTER INSERT ON matches "
+                               "BEGIN UPDATE entries SET n = n + 1; END")
+      self._connection.execute("CREATE TRIGGER IF NOT EXISTS matches_delete AFTER DELETE ON matches "
+                               "BEGIN UPDATE entries SET n = n - 1; END")
+      self._connection.execute("COMMIT")
+      self._pid = os.getpid()
+    return self._connection
+
+  def get(self, key: str) -> list[tuple[axl.Action, axl.Action]] | None:
+    row = self.connection.execute("SELECT interactions FROM matches WHERE key = ?", (key,)).fetchone()
+    if row is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.connection.execute("UPDATE matches SET last_access = ? WHERE key = ?", (time.time(), key))
+    return decode(row[0])
+
+  def put(self, key: str, interactions: list[tuple[axl.Action, axl.Action]]) -> None:
+    # An upsert rather than INSERT OR REPLACE, whose deletions don't fire the count trigger
+    self.connection.execute("INSERT INTO matches VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                            "interactions = excluded.interactions, last_access = excluded.last_access",
+                            (key, encode(interactions), time.time()))
+    if len(self) > self.max_entries:
+      self.evict()
+
+  def evict(self) -> None:
+    """Drop the least recently used matches beyond max_entries."""
+    surplus = len(self) - self.max_entries
+    if surplus > 0:
+      self.connection.execute(
+          "DELETE FROM matches WHERE key IN (SELECT key FROM matches ORDER BY last_access, rowid LIMIT ?)",
+          (surplus,))
+
+  def __len__(self) -> int:
+    return self.connection.execute("SELECT n FROM entries").fetchone()[0]
+
+  def play(self, match: axl.Match, play_index: int, play) -> list[tuple[axl.Action, axl.Action]]:
+    """Read-through: the cached interactions of the match, or play() them and store the result."""
+    key = match_key(match, play_index)
+    if key is None:
+      return play()
+    interactions = self.get(key)
+    if interactions is None:
+      interactions = play()
+      self.put(key, interactions)
+    else:
+      advance(match)
+      match.result = interactions
+    return interactions
+
+
+def cached(match_class: type[axl.Match], cache: MatchCache) -> type[axl.Match]:
+  """Subclass of match_class that reads and fills the cache, for engine.install."""
+
+  class CachedMatch(match_class):
+    def play(self) -> list[tuple[axl.Action, axl.Action]]:
+      play_index = getattr(self, "_play_index", 0)
+      self._play_index = play_index + 1
+      return cache.play(self, play_index, super().play)
+
+  return CachedMatch
@@ -0,0 +1,486 @@
+"""Faster Moran processes with the interface of axl.MoranProcess.
+
+axl.MoranProcess plays a full round robin of matches every step. Both processes here keep its
+default birth-death mode: individual fitness is the sum of its payoffs per turn against every other
+individual, as in axl.MoranProcess.score_all, a parent is chosen proportionally to fitness and the
+individual it replaces uniformly among the whole population (including the parent), as with the
+loops of the default reproduction graph.
+
+MatrixMoranProcess runs on the expected payoffs between types, when fitness only depends on those.
+SampledMoranProcess is the same process in O(log K) steps for K types, for large populations of
+many strategies, and lockstep runs many replicates of it at once as NumPy arrays.
+GraphMoranProcess is the process on an interaction graph, with fitness over neighbours only.
+MemoisedMoranProcess is axl.MoranProcess reusing the fitness of population compositions it has
+already scored, for deterministic players.
+IncrementalMoranProcess plays matches between individuals, but after each step
+only replays the matches of the replaced individual, so a step costs N - 1 matches instead of
+N(N - 1) / 2.
+"""
+
+from collections import Counter, OrderedDict
+
+import axelrod as axl
+import matplotlib.pyplot as plt
+import numpy as np
+
+from evollm import common, engine, match_cache, trajectories
+from evollm.fenwick import FenwickTree
+
+
+class PopulationProcess:
+  """Iteration, fixation and plotting shared by the processes, as in axl.MoranProcess."""
+
+  populations: list[Counter]
+
+  def __next__(self) -> "PopulationProcess":
+    raise NotImplementedError
+
+  def __iter__(self) -> "PopulationProcess":
+    return self
+
+  def __len__(self) -> int:
+    return len(self.populations)
+
+  def fixation_check(self) -> bool:
+    return len(self.populations[-1]) == 1
+
+  def play(self) -> list[Counter]:
+    """Run until fixation, returning the population distribution of every step."""
+    for _ in self:
+      pass
+    return self.populations
+
+  @property
+  def winning_strategy_name(self) -> str:
+    assert self.fixation_check(), "The process has not fixated"
+    return next(iter(self.populations[-1]))
+
+  def populations_plot(self, ax: plt.Axes | None = None) -> plt.Axes:
+    """Stackplot of the number of individuals of each type by iteration, as axl.MoranProcess."""
+    names = list(self.populations[0])
+    if ax is None:
+      _, ax = plt.subplots()
+    values = [[population[name] for population in self.populations] for name in names]
+    ax.stackplot(range(len(self.populations)), values, labels=names)
+    ax.set_title("Moran Process Population by Iteration")
+    ax.set_xlabel("Iteration")
+    ax.set_ylabel("Number of Individuals")
+    ax.legend()
+    return ax
+
+
+class MatrixMoranProcess(PopulationProcess):
+  """Birth-death Moran process over population counts of types with payoffs[x, y] between them."""
+
+  def __init__(self, payoffs: np.ndarray, names: list[str], initial: list[int],
+               seed: int | np.random.SeedSequence | None = None) -> None:
+    self.payoffs = np.asarray(payoffs, dtype=float)
+    self.names = list(names)
+    self.counts = np.array(initial, dtype=np.int64)
+    self.population_size = int(self.counts.sum())
+    assert self.payoffs.shape == (len(self.names), len(self.names)) == (len(self.counts),) * 2
+    self._random = np.random.default_rng(seed)
+    self.populations: list[Counter] = [self.population_distribution()]
+
+  def population_distribution(self) -> Counter:
+    """Counter of the names of the individuals, as axl.MoranProcess.population_distribution."""
+    return Counter({name: int(n) for name, n in zip(self.names, self.counts) if n})
+
+  def fitness(self) -> np.ndarray:
+    """Fitness of an individual of each type: its payoffs against everyone but itself."""
+    return self.payoffs @ self.counts - np.diag(self.payoffs)
+
+  def fixation_check(self) -> bool:
+    return bool(self.counts.max() == self.population_size)
+
+  def __next__(self) -> "MatrixMoranProcess":
+    if self.fixation_check():
+      raise StopIteration
+    weights = np.cumsum(self.counts * self.fitness())
+    if weights[-1] <= 0:
+      weights = np.cumsum(self.counts)
+    birth = np.searchsorted(weights, self._random.random() * weights[-1], side="right")
+    death = np.searchsorted(np.cumsum(self.counts), self._random.integers(self.population_size),
+                            side="right")
+    self.counts[birth] += 1
+    self.counts[death] -= 1
+    self.populations.append(self.population_distribution())
+    return self
+
+  @property
+  def winning_strategy_name(self) -> str:
+    assert self.fixation_check(), "The process has not fixated"
+    return self.names[int(self.counts.argmax())]
+
+
+class RecordedProcess(PopulationProcess):
+  """A finished process replayed from its counts of every type at every step, e.g. for plotting."""
+
+  def __init__(self, names: list[str], counts: np.ndarray) -> None:
+    self.names = list(names)
+    self.populations = [Counter({name: int(n) for name, n in zip(self.names, row) if n}) for row in counts]
+
+  def __next__(self) -> "RecordedProcess":
+    raise StopIteration
+
+
+class SampledMoranProcess(PopulationProcess):
+  """MatrixMoranProcess for many types, without computing the fitness of every type each step.
+
+  The counts are kept in a Fenwick tree, so drawing a uniform individual and updating the counts
+  take O(log K). A parent is drawn proportionally to fitness by rejection: an ordered pair of
+  distinct individuals (i, j) is drawn uniformly and accepted with probability
+  payoffs[i, j] / max(payoffs), so i is accepted proportionally to its summed payoffs against
+  everyone else. After max_rejections rejections in a row, as when few payoffs are large, the
+  parent is drawn from the fitness of every type instead. With record=False only the first
+  population is kept, for long runs.
+  """
+
+  max_rejections = 1000
+
+  def __init__(self, payoffs: np.ndarray, names: list[str], initial: list[int],
+               seed: int | np.random.SeedSequence | np.random.Generator | None = None,
+               record: bool = True) -> None:
+    self.payoffs = np.asarray(payoffs, dtype=float)
+    assert (self.payoffs >= 0).all(), "Rejection sampling needs non-negative payoffs"
+    self.names = list(names)
+    self.counts = FenwickTree(int(n) for n in initial)
+    self.population_size = self.counts.total()
+    self.record = record
+    self.steps = 0
+    self._max_payoff = self.payoffs.max()
+    self._present = sum(1 for n in initial if n)
+    self._random = np.random.default_rng(seed)
+    self.populations: list[Counter] = [
+        Counter({name: int(n) for name, n in zip(self.names, initial) if n})]
+
+  def __len__(self) -> int:
+    return self.steps + 1
+
+  def fixation_check(self) -> bool:
+    return self._present == 1
+
+  @property
+  def winning_strategy_name(self) -> str:
+    assert self.fixation_check(), "The process has not fixated"
+    return next(name for i, name in enumerate(self.names) if self.counts[i])
+
+  def _birth(self) -> int:
+    random = self._random.random
+    if self._max_payoff <= 0:
+      return self.counts.sample(random())
+    for _ in range(self.max_rejections):
+      i = self.counts.sample(random())
+      # The partner is uniform among the other individuals
+      self.counts.add(i, -1)
+      j = self.counts.sample(random())
+      self.counts.add(i, 1)
+      if random() * self._max_payoff < self.payoffs[i, j]:
+        return i
+    counts = np.array([self.counts[i] for i in range(len(self.counts))])
+    weights = np.cumsum(counts * (self.payoffs @ counts - np.diag(self.payoffs)))
+    if weights[-1] <= 0:
+      weights = np.cumsum(counts)
+    return int(np.searchsorted(weights, random() * weights[-1], side="right"))
+
+  def _move(self, i: int, delta: int) -> None:
+    before = self.counts[i]
+    self.counts.add(i, delta)
+    self._present += (self.counts[i] > 0) - (before > 0)
+
+  def __next__(self) -> "SampledMoranProcess":
+    if self.fixation_check():
+      raise StopIteration
+    birth = self._birth()
+    death = self.counts.sample(self._random.random())
+    self._move(birth, 1)
+    self._move(death, -1)
+    self.steps += 1
+    if self.record:
+      population = self.populations[-1].copy()
+      population[self.names[birth]] += 1
+      population[self.names[death]] -= 1
+      self.populations.append(+population)
+    return self
+
+
+def _lockstep(payoffs: np.ndarray, initial: list[int], seeds: list[int] | list[np.random.SeedSequence],
+              block: int, record: bool) -> tuple[np.ndarray, np.ndarray, list[tuple]]:
+  # Winners, lengths and, with record, the replicates, births and deaths of every step
+  payoffs = np.asarray(payoffs, dtype=float)
+  population_size = int(sum(initial))
+  generators = [np.random.default_rng(seed) for seed in seeds]
+  replicates = np.arange(len(seeds))
+  counts = np.tile(np.asarray(initial, dtype=np.int64), (len(seeds), 1))
+  winners = np.zeros(len(seeds), dtype=np.int64)
+  lengths = np.zeros(len(seeds), dtype=np.int64)
+  history = []
+  randoms = np.zeros((0, block, 2))
+  step = 0
+  while True:
+    fixated = counts.max(axis=1) == population_size
+    if fixated.any():
+      winners[replicates[fixated]] = counts[fixated].argmax(axis=1)
+      lengths[replicates[fixated]] = step + 1
+      replicates, counts = replicates[~fixated], counts[~fixated]
+      if not len(replicates):
+        break
+      if step % block:
+        randoms = randoms[~fixated]
+    if step % block == 0:
+      randoms = np.stack([generators[r].random((block, 2)) for r in replicates])
+    births, deaths = randoms[:, step % block].T
+
+    weights = np.cumsum(counts * (counts @ payoffs.T - np.diag(payoffs)), axis=1)
+    # As MatrixMoranProcess, fall back to uniform births if every fitness is zero
+    weights = np.where(weights[:, -1:] > 0, weights, np.cumsum(counts, axis=1))
+    birth = (weights <= (births * weights[:, -1])[:, None]).sum(axis=1)
+    death = (np.cumsum(counts, axis=1) <= np.floor(deaths * population_size)[:, None]).sum(axis=1)
+    rows = np.arange(len(replicates))
+    counts[rows, birth] += 1
+    counts[rows, death] -= 1
+    if record:
+      history.append((replicates, birth, death))
+    step += 1
+  return winners, lengths, history
+
+
+def lockstep(payoffs: np.ndarray, initial: list[int], seeds: list[int] | list[np.random.SeedSequence],
+             block: int = 256) -> tuple[np.ndarray, np.ndarray]:
+  """Winning type and length of a MatrixMoranProcess replicate for each seed, run in lockstep.
+
+  The counts of the replicates that have not fixated are an R x K array advanced one step at a time
+  with array operations, and fixated replicates are retired from it. Each replicate draws two
+  uniform numbers per step from its own generator, in blocks of the given number of steps, so its
+  result depends only on its seed and not on the other replicates. The trajectories differ from
+  those of MatrixMoranProcess with the same seed, but follow the same process.
+  """
+  winners, lengths, _ = _lockstep(payoffs, initial, seeds, block, record=False)
+  return winners, lengths
+
+
+def lockstep_trajectories(payoffs: np.ndarray, initial: list[int],
+                          seeds: list[int] | list[np.random.SeedSequence],
+                          block: int = 256) -> tuple[np.ndarray, np.ndarray, list[bytes]]:
+  """As lockstep, with the trajectory of each replicate encoded by evollm.trajectories."""
+  winners, lengths, history = _lockstep(payoffs, initial, seeds, block, record=True)
+  # The steps of each replicate, in order, are contiguous once sorted by replicate
+  replicates, births, deaths = (np.concatenate(a) for a in zip(*history, ([], [], [])))
+  order = np.argsort(replicates, kind="stable")
+  births, deaths = births[order].astype(np.int64), deaths[order].astype(np.int64)
+  stops = np.cumsum(lengths - 1)
+  return winners, lengths, [trajectories.encode_steps(initial, births[stop - n:stop], deaths[stop - n:stop])
+                            for stop, n in zip(stops, lengths - 1)]
+
+
+class GraphMoranProcess(PopulationProcess):
+  """Birth-death Moran process of types on the nodes of an interaction graph.
+
+  As axl.MoranProcess with an interaction graph and its default reproduction graph, the fitness of a
+  node is the sum of its payoffs against its neighbours, a parent is chosen proportionally to
+  fitness among all nodes and it replaces a uniformly chosen node among itself and its neighbours.
+  adjacency is a sparse symmetric matrix as from evollm.graphs. Node fitness is kept in a Fenwick
+  tree and only the newborn and its neighbours are updated, so a step costs O(degree log N) and
+  graphs of 10k nodes are cheap.
+  """
+
+  def __init__(self, payoffs: np.ndarray, names: list[str], types, adjacency,
+               seed: int | np.random.SeedSequence | np.random.Generator | None = None,
+               record: bool = True) -> None:
+    self.payoffs = np.asarray(payoffs, dtype=float)
+    assert (self.payoffs >= 0).all(), "Fitness proportional selection needs non-negative payoffs"
+    self.names = list(names)
+    self.types = np.array(types, dtype=np.int64)
+    self.adjacency = adjacency.tocsr()
+    assert self.adjacency.shape == (len(self.types),) * 2
+    self.record = record
+    self.steps = 0
+    self._random = np.random.default_rng(seed)
+    self._counts = np.bincount(self.types, minlength=len(self.names))
+    self._neighbours = [self.adjacency.indices[start:stop] for start, stop in
+                        zip(self.adjacency.indptr[:-1], self.adjacency.indptr[1:])]
+    self._rebuild()
+    self.populations: list[Counter] = [self.population_distribution()]
+
+  def _rebuild(self) -> None:
+    """Recompute every fitness, removing the rounding accumulated by the updates."""
+    rows = np.repeat(np.arange(len(self.types)), np.diff(self.adjacency.indptr))
+    pair_payoffs = self.payoffs[self.types[rows], self.types[self.adjacency.indices]]
+    self.fitness = np.bincount(rows, weights=pair_payoffs, minlength=len(self.types))
+    self._tree = FenwickTree(self.fitness.tolist())
+
+  def population_distribution(self) -> Counter:
+    return Counter({name: int(n) for name, n in zip(self.names, self._counts) if n})
+
+  def __len__(self) -> int:
+    return self.steps + 1
+
+  def fixation_check(self) -> bool:
+    return bool(self._counts.max() == len(self.types))
+
+  @property
+  def winning_strategy_name(self) -> str:
+    assert self.fixation_check(), "The process has not fixated"
+    return self.names[int(self._counts.argmax())]
+
+  def __next__(self) -> "GraphMoranProcess":
+    if self.fixation_check():
+      raise StopIteration
+    if self._tree.total() > 0:
+      parent = self._tree.sample(self._random.random())
+    else:
+      parent = int(self._random.integers(len(self.types)))
+    # The default reproduction graph of axl.MoranProcess has loops
+    choices = self._neighbours[parent]
+    choice = int(self._random.integers(len(choices) + 1))
+    dead = parent if choice == len(choices) else int(choices[choice])
+
+    old, new = self.types[dead], self.types[parent]
+    if old != new:
+      self.types[dead] = new
+      self._counts[old] -= 1
+      self._counts[new] += 1
+      neighbours = self._neighbours[dead]
+      neighbour_types = self.types[neighbours]
+      self.fitness[neighbours] += self.payoffs[neighbour_types, new] - self.payoffs[neighbour_types, old]
+      self.fitness[dead] = self.payoffs[new, neighbour_types].sum()
+      for node in neighbours.tolist():
+        self._tree[node] = self.fitness[node]
+      self._tree[dead] = self.fitness[dead]
+    self.steps += 1
+    if self.steps % len(self.types) == 0:
+      self._rebuild()
+    if self.record:
+      self.populations.append(self.population_distribution())
+    return self
+
+
+def deterministic(player: axl.Player) -> bool:
+  """Whether a player always plays the same against the same opponent, without noise."""
+  if isinstance(player, common.LLM_Strategy):
+    # StrategySampler instances draw the strategy they play every match
+    return player.deterministic and not hasattr(type(player), "strategies")
+  return not axl.Classifiers["stochastic"](player)
+
+
+class FitnessMemo:
+  """Bounded LRU of the score of each type of player in a population composition."""
+
+  def __init__(self, max_entries: int = 100_000) -> None:
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self._entries: OrderedDict = OrderedDict()
+
+  def get(self, key) -> dict[str, float] | None:
+    scores = self._entries.get(key)
+    if scores is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self._entries.move_to_end(key)
+    return scores
+
+  def put(self, key, scores: dict[str, float]) -> None:
+    self._entries[key] = scores
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+
+# Shared by the processes of a worker, so replicate runs reuse each other's compositions
+fitness_memo = FitnessMemo()
+
+
+class MemoisedMoranProcess(axl.MoranProcess):
+  """axl.MoranProcess that scores each population composition of deterministic players once.
+
+  Without noise, the total score of a deterministic player against the rest of a well-mixed
+  population only depends on its strategy and on the composition of the population, so the scores
+  are kept in memo by composition, across steps and runs. Populations with other players, noise,
+  an interaction graph or another mode are scored as by axl.MoranProcess. Match seeds come from a
+  separate generator, so the births and deaths, hence the runs, are the same as with
+  axl.MoranProcess.
+  """
+
+  def __init__(self, *args, memo: FitnessMemo | None = None, **kwargs) -> None:
+    super().__init__(*args, **kwargs)
+    self.memo = fitness_memo if memo is None else memo
+    self.memoised = (not self.noise and self.prob_end is None and self.mode == "bd" and
+                     len(self.interaction_graph.edges) == len(self.players) * (len(self.players) - 1) and
+                     all(deterministic(p) for p in self.players))
+
+  def score_all(self) -> list:
+    if not self.memoised:
+      return super().score_all()
+    keys = [match_cache.player_key(p) for p in self.players]
+    types = [key for key in keys if key is not None]
+    if len(types) < len(keys):
+      return super().score_all()
+    key = (tuple(sorted(Counter(types).items())), self.turns, (self.game or axl.Game()).RPST())
+    scores_by_type = self.memo.get(key)
+    if scores_by_type is None:
+      scores = super().score_all()
+      self.memo.put(key, dict(zip(types, scores)))
+      return scores
+    scores = [scores_by_type[t] for t in types]
+    self.score_history.append(scores)
+    return scores
+
+
+class IncrementalMoranProcess(PopulationProcess):
+  """Birth-death Moran process over players, replaying only the matches of the newborn.
+
+  scores[i, j] is the payoff per turn of individual i in its last match against j. Unlike
+  axl.MoranProcess, matches between individuals that were not replaced are not replayed every step:
+  each pair keeps the outcome of the match it played when the younger of the two was born. Matches
+  are played with engine.Match, i.e. through the fast engine and the match cache when installed.
+  """
+
+  def __init__(self, players: list[axl.Player], turns: int, noise: float = 0,
+               game: axl.Game | None = None, seed: int | np.random.SeedSequence | None = None) -> None:
+    self.players = list(players)
+    self.turns = turns
+    self.noise = noise
+    self.game = game or axl.Game()
+    self._random = np.random.default_rng(seed)
+    n = len(self.players)
+    self.scores = np.zeros((n, n))
+    for i in range(n):
+      self._replay(i, range(i + 1, n))
+    self.fitness = self.scores.sum(axis=1)
+    self.populations: list[Counter] = [Counter(str(p) for p in self.players)]
+
+  def _replay(self, i: int, opponents) -> None:
+    """Play individual i against each opponent, updating the scores of both."""
+    opponents = list(opponents)
+    seeds = self._random.integers(2**32 - 1, size=len(opponents))
+    for j, seed in zip(opponents, seeds.tolist()):
+      match = engine.Match((self.players[i], self.players[j]), turns=self.turns, game=self.game,
+                           noise=self.noise, seed=seed)
+      match.play()
+      self.scores[i, j], self.scores[j, i] = match.final_score_per_turn()
+
+  def __next__(self) -> "IncrementalMoranProcess":
+    if self.fixation_check():
+      raise StopIteration
+    weights = np.cumsum(self.fitness)
+    if weights[-1] <= 0:
+      weights = np.arange(1, len(self.players) + 1)
+    birth = int(np.searchsorted(weights, self._random.random() * weights[-1], side="right"))
+    death = int(self._random.integers(len(self.players)))
+
+    population = self.populations[-1].copy()
+    population[str(self.players[death])] -= 1
+    self.players[death] = self.players[birth].clone()
+    population[str(self.players[death])] += 1
+    self.populations.append(+population)
+
+    previous = self.scores[:, death].copy()
+    self._replay(death, (k for k in range(len(self.players)) if k != death))
+    self.fitness += self.scores[:, death] - previous
+    self.fitness[death] = self.scores[death].sum()
+    return self
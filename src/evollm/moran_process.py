@@ -1,12 +1,19 @@
 import argparse
-import axelrod as axl
+import contextlib
 import pprint
 import matplotlib.pyplot as plt
-from multiprocessing import Pool
 import numpy as np
 
 from evollm import common
-from evollm import algorithms
+from evollm import confidence
+from evollm import dynamics
+from evollm import engine
+from evollm import fixation
+from evollm import graphs
+from evollm import moran_worker
+from evollm import payoffs
+from evollm import seeds
+from evollm import trajectories
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -17,6 +24,23 @@ def parse_arguments() -> argparse.Namespace:
       type=str,
       required=True,
       help="Name of the python module with the LLM algorithms")
+  parser.add_argument(
+      "--rewrite",
+      action="store_true",
+      help="Rewrite history slicing in the strategies onto incremental statistics when loading")
+  parser.add_argument(
+      "--fast",
+      action="store_true",
+      help="Play matches with the fast match engine")
+  parser.add_argument(
+      "--cache",
+      type=str,
+      help="SQLite file caching the interactions of every match played, across runs")
+  parser.add_argument(
+      "--cache_entries",
+      type=common.positive_int,
+      default=1_000_000,
+      help="Maximum number of matches kept in the cache")
   parser.add_argument(
       "--initial_pop",
       nargs=3,
@@ -27,7 +51,22 @@ def parse_arguments() -> argparse.Namespace:
       "--iterations",
       type=int,
       default=100,
-      help="Number of times to run the simulation")
+      help="Number of times to run the simulation (at most, with --target_ci)")
+  parser.add_argument(
+      "--target_ci",
+      type=float,
+      help="Run batches of --batch_runs until the confidence interval on the fixation probability of "
+           "every attitude is narrower than this, up to --iterations runs")
+  parser.add_argument(
+      "--batch_runs",
+      type=common.positive_int,
+      default=100,
+      help="Number of runs between checks of the confidence intervals with --target_ci")
+  parser.add_argument(
+      "--confidence",
+      type=float,
+      default=0.95,
+      help="Simultaneous confidence level of the intervals on the fixation probabilities")
   parser.add_argument(
       "--keep_top",
       type=common.temp_arg,
@@ -43,35 +82,127 @@ def parse_arguments() -> argparse.Namespace:
       type=common.positive_int,
       default=1,
       help="Number of processes to run simultaneously")
+  parser.add_argument(
+      "--chunksize",
+      type=common.positive_int,
+      help="Number of seeds sent to a worker at a time (default: a quarter of the runs per process)")
+  parser.add_argument(
+      "--fixed_strategies",
+      action="store_true",
+      help="Each individual plays one strategy of its attitude for life instead of drawing one every "
+           "match; the winners are strategies")
+  parser.add_argument(
+      "--matrix",
+      action="store_true",
+      help="Run the process on the expected payoffs between the strategies instead of playing matches, "
+           "with the runs of each chunk advanced together as arrays")
+  parser.add_argument(
+      "--sampled",
+      action="store_true",
+      help="Run the --matrix process with Fenwick tree sampling, for populations of thousands")
+  parser.add_argument(
+      "--graph",
+      choices=graphs.KINDS,
+      help="Run the process on the expected payoffs over a random interaction graph of this kind, "
+           "each individual only playing its neighbours")
+  parser.add_argument(
+      "--dynamics",
+      choices=["moran", "replicator", "wright_fisher"],
+      default="moran",
+      help="Population dynamics on the expected payoffs: replicator plots the phase portrait of the "
+           "replicator equation, wright_fisher runs --iterations Wright-Fisher populations")
+  parser.add_argument(
+      "--incremental",
+      action="store_true",
+      help="Only replay the matches of the replaced individual each step instead of all of them")
+  parser.add_argument(
+      "--exact",
+      action="store_true",
+      help="Solve for the fixation probabilities of the --matrix process instead of simulating it")
+  parser.add_argument(
+      "--repetitions",
+      type=common.positive_int,
+      default=10,
+      help="Matches per pair of strategies to estimate the expected payoffs with --matrix or --exact")
+  parser.add_argument(
+      "--seed",
+      type=int,
+      default=1,
+      help="Seed of the batch: run k is seeded from (seed, k), see evollm.seeds")
+  parser.add_argument(
+      "--shard",
+      nargs=2,
+      type=int,
+      default=[0, 1],
+      metavar=("INDEX", "COUNT"),
+      help="Only play the runs k with k %% COUNT == INDEX, to split a batch over machines")
+  parser.add_argument(
+      "--output",
+      type=str,
+      help="Save the winner and length of every run to this JSON file, for seeds.py to merge")
+  parser.add_argument(
+      "--trajectories",
+      type=str,
+      help="Save the population trajectory of every run to this SQLite file, see evollm.trajectories")
   parser.add_argument(
       "--plot",
       action="store_true",
-      help="Plot an example trajectory instead")
+      help="Plot the trajectory of the first run of the batch instead")
 
-  return parser.parse_args()
+  args = parser.parse_args()
+  if args.sampled and not args.matrix:
+    parser.error("--sampled runs the --matrix process, pass --matrix as well")
+  if args.sampled and (args.exact or args.graph or args.dynamics != "moran"):
+    parser.error("--sampled only applies to the simulated --matrix process, not to --exact, --graph or --dynamics")
+  if args.incremental and (args.matrix or args.exact or args.graph or args.dynamics != "moran"):
+    parser.error("--incremental replays matches between players, it doesn't apply to the payoff matrix of "
+                 "--matrix, --exact, --graph or --dynamics")
+  if args.target_ci and args.shard != [0, 1]:
+    parser.error("--target_ci stops on the whole batch, it can't be split with --shard")
+  return args
 
 
 if __name__ == "__main__":
   parsed_args = parse_arguments()
 
-  # N.B. create separate instances for each player, not copies!
-  algos = algorithms.load_algorithms(parsed_args.algo, parsed_args.keep_top, parsed_args.keep_bottom)
-  classes = algorithms.create_classes(algos)
-  players = [cls() for cls, count in zip(classes, parsed_args.initial_pop) for _ in range(count)]
-  print(players)
+  engine.install_args(parsed_args)
 
-  if parsed_args.plot:
-    mp = axl.MoranProcess(
-        players,
-        seed=1,
-        turns=algos[0].rounds,
-        noise=algos[0].noise,
-        game=common.get_game(algos[0].game))
+  algos, classes = moran_worker.load_classes(parsed_args)
+  print(moran_worker.create_players(classes, parsed_args.initial_pop))
 
-    populations = mp.play()
-    ax = mp.populations_plot()
+  payoff_matrix = None
+  if parsed_args.matrix or parsed_args.exact or parsed_args.graph or parsed_args.dynamics != "moran":
+    payoff_matrix = payoffs.attitude_payoffs(classes, common.get_game(algos[0].game), algos[0].rounds,
+                                             algos[0].noise, parsed_args.repetitions, parsed_args.seed)
+    print(payoff_matrix)
 
-    fig = ax.get_figure()
+  if parsed_args.exact:
+    probabilities, steps = fixation.fixation(payoff_matrix, parsed_args.initial_pop)
+    print({str(cls()): float(p) for cls, p in zip(classes, probabilities)})
+    print(f"Mean number of steps to fixation: {steps:.1f}")
+  elif parsed_args.dynamics == "replicator":
+    names = [str(cls()) for cls in classes]
+    shares = dynamics.replicator(payoff_matrix, parsed_args.initial_pop)
+    print({name: round(float(x), 4) for name, x in zip(names, shares[-1, 0])})
+    fig, ax = plt.subplots()
+    dynamics.phase_portrait(payoff_matrix, ['Aggressive', 'Cooperative', 'Neutral'], parsed_args.initial_pop, ax=ax)
+    fig.savefig("results/replicator.png", dpi=500, bbox_inches='tight')
+  elif parsed_args.dynamics == "wright_fisher":
+    names = [str(cls()) for cls in classes]
+    seed, = seeds.stream_sequences(parsed_args.seed, seeds.WRIGHT_FISHER, [0])
+    winners, generations = dynamics.wright_fisher(payoff_matrix, parsed_args.initial_pop,
+                                                  parsed_args.iterations, seed)
+    winner_counts: dict[str | None, int] = {}
+    for winner in winners.tolist():
+      name = names[winner] if winner >= 0 else None
+      winner_counts[name] = winner_counts.get(name, 0) + 1
+    print(winner_counts)
+    print(f"Mean number of generations to fixation: {generations.mean():.1f}")
+  elif parsed_args.plot:
+    seed, = seeds.stream_sequences(parsed_args.seed, seeds.MORAN_RUNS, [0])
+    mp = moran_worker.play_run(parsed_args, algos, classes, seed, payoff_matrix)
+    fig, ax = plt.subplots()
+    mp.populations_plot(ax=ax)
     fig.set_size_inches(3, 2)
 
     ax.set_title('Population by iteration', fontsize=8)
@@ -85,37 +216,50 @@ if __name__ == "__main__":
     ax.set_ylim(0, 12)
     ax.set_yticks(np.arange(0, 12 + 1, 4))
 
-    fig = ax.get_figure()
     fig.savefig("results/example_moran.png", dpi=500, bbox_inches='tight')
   else:
-    def run_moran_process(seed):
-      mp = axl.MoranProcess(
-          players,
-          seed=seed,
-          turns=algos[0].rounds,
-          noise=algos[0].noise,
-          game=common.get_game(algos[0].game))
-
-      populations = mp.play()
-      # pprint.pprint(populations)
-      print(mp.winning_strategy_name, len(mp))
-      return mp.winning_strategy_name
-
-    seeds = np.random.randint(0, np.iinfo(np.uint32).max, size=parsed_args.iterations)
-
-    if parsed_args.processes > 1:
-      with Pool(processes=parsed_args.processes) as pool:
-        results = pool.map(run_moran_process, seeds)
-    else:
-      results = []
-      for i in range(parsed_args.iterations):
-        results.append(run_moran_process(seeds[i]))
+    runs = seeds.shard(parsed_args.iterations, *parsed_args.shard)
+    batch_runs = len(runs)
+    if parsed_args.target_ci:
+      batch_runs = parsed_args.batch_runs
+    names = [str(cls()) for cls in classes]
 
+    results = {}
     winner_counts = {}
-    for winner in results:
-        winner_counts[winner] = winner_counts.get(winner, 0) + 1
+    attitude_counts: dict[str, int] = {}
+    # With --fixed_strategies the winners are strategies, the intervals are still by attitude
+    attitudes = {s.__name__: str(cls()) for cls in classes for s in cls.strategies}
+    winner_intervals = confidence.intervals(attitude_counts, names, parsed_args.confidence)
+    with contextlib.ExitStack() as stack:
+      # The trajectory store is closed even if a batch raises or is interrupted
+      store = None
+      if parsed_args.trajectories:
+        store = stack.enter_context(contextlib.closing(trajectories.TrajectoryStore(parsed_args.trajectories)))
+        store.set_meta(names, parsed_args.seed)
+      play = stack.enter_context(moran_worker.workers(parsed_args, algos, classes, payoff_matrix,
+                                                      parsed_args.processes, parsed_args.chunksize))
+      for start in range(0, len(runs), batch_runs):
+        batch = runs[start:start + batch_runs]
+        run_seeds = list(zip(batch, seeds.stream_sequences(parsed_args.seed, seeds.MORAN_RUNS, batch)))
+        for run, winner, length, encoded in play(run_seeds):
+          print(winner, length)
+          results[run] = [winner, length]
+          if store is not None:
+            store.put(run, encoded)
+          winner_counts[winner] = winner_counts.get(winner, 0) + 1
+          attitude = attitudes.get(winner, winner)
+          attitude_counts[attitude] = attitude_counts.get(attitude, 0) + 1
+
+        winner_intervals = confidence.intervals(attitude_counts, names, parsed_args.confidence)
+        if parsed_args.target_ci and confidence.precise(winner_intervals, parsed_args.target_ci):
+          break
+
+    if parsed_args.output:
+      seeds.save_runs(parsed_args.output, parsed_args.seed, results)
 
+    print(f"{len(results)} runs")
     print(winner_counts)
+    print({name: (round(low, 4), round(high, 4)) for name, (low, high) in winner_intervals.items()})
 
   # for row in mp.score_history:
   #   print([round(element, 1) for element in row])
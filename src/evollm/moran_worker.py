@@ -0,0 +1,157 @@
+"""Process pool workers for moran_process.py.
+
+Every worker of the evollm.pools pool loads the strategy module and rebuilds the StrategySampler
+classes once, so only seeds and results cross process boundaries. The seed of each run comes from
+evollm.seeds, so results don't depend on how the runs are spread over workers.
+"""
+
+import argparse
+import contextlib
+from collections import Counter
+from typing import Callable, Iterator
+
+import axelrod as axl
+import numpy as np
+
+from evollm import algorithms, common, engine, graphs, moran, pools, seeds, trajectories
+
+# Set by _set_state in each worker
+_args: argparse.Namespace | None = None
+_algos: list[type[common.LLM_Strategy]] = []
+_classes: tuple[type[common.LLM_Strategy], ...] = ()
+_payoffs: np.ndarray | None = None
+
+
+def load_classes(
+    args: argparse.Namespace) -> tuple[list[type[common.LLM_Strategy]], tuple[type[common.LLM_Strategy], ...]]:
+  algos = algorithms.load_algorithms(args.algo, args.keep_top, args.keep_bottom, args.rewrite)
+  return algos, algorithms.create_classes(algos)
+
+
+def create_players(classes: tuple[type[common.LLM_Strategy], ...],
+                   initial_pop: list[int]) -> list[common.LLM_Strategy]:
+  # N.B. create separate instances for each player, not copies!
+  return [cls() for cls, count in zip(classes, initial_pop) for _ in range(count)]
+
+
+def fixed_players(classes: tuple[type[common.LLM_Strategy], ...], initial_pop: list[int],
+                  seed: np.random.SeedSequence) -> list[common.LLM_Strategy]:
+  """Players of the attitudes that each play one of their strategies, drawn from seed, for life."""
+  random = np.random.default_rng(seed)
+  return [cls.strategies[random.integers(len(cls.strategies))]()
+          for cls, count in zip(classes, initial_pop) for _ in range(count)]
+
+
+def create_process(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]],
+                   classes: tuple[type[common.LLM_Strategy], ...], seed: np.random.SeedSequence,
+                   payoff_matrix: np.ndarray | None = None) -> axl.MoranProcess | moran.PopulationProcess:
+  """The Moran process of one run, on the payoff matrix if one is given."""
+  if payoff_matrix is not None and args.graph:
+    # The graph and the placement of the attitudes on it are drawn anew for every run
+    random = np.random.default_rng(seed)
+    adjacency = graphs.create(args.graph, sum(args.initial_pop), random)
+    types = random.permutation(np.repeat(np.arange(len(classes)), args.initial_pop))
+    return moran.GraphMoranProcess(payoff_matrix, [str(cls()) for cls in classes], types, adjacency, random,
+                                   record=args.plot or bool(args.trajectories))
+  if payoff_matrix is not None and args.sampled:
+    return moran.SampledMoranProcess(payoff_matrix, [str(cls()) for cls in classes], args.initial_pop, seed,
+                                     record=args.plot or bool(args.trajectories))
+  if payoff_matrix is not None:
+    return moran.MatrixMoranProcess(payoff_matrix, [str(cls()) for cls in classes], args.initial_pop, seed)
+  # The strategies drawn for life and the process each get their own stream
+  strategy_seed, process_seed = seeds.children(seed, 2)
+  if args.fixed_strategies:
+    players = fixed_players(classes, args.initial_pop, strategy_seed)
+  else:
+    players = create_players(classes, args.initial_pop)
+  if args.incremental:
+    return moran.IncrementalMoranProcess(
+        players,
+        turns=algos[0].rounds,
+        noise=algos[0].noise,
+        game=common.get_game(algos[0].game),
+        seed=process_seed)
+  # Memoised by population composition when the players are deterministic
+  return moran.MemoisedMoranProcess(
+      players,
+      seed=seeds.int_seed(process_seed),
+      turns=algos[0].rounds,
+      noise=algos[0].noise,
+      game=common.get_game(algos[0].game),
+      match_class=engine.Match)
+
+
+def lockstepped(args: argparse.Namespace) -> bool:
+  """Whether the runs on a payoff matrix are advanced together by moran.lockstep."""
+  return not args.sampled and not args.graph
+
+
+def play_run(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]],
+             classes: tuple[type[common.LLM_Strategy], ...], seed: np.random.SeedSequence,
+             payoff_matrix: np.ndarray | None = None) -> axl.MoranProcess | moran.PopulationProcess:
+  """The process of one run played to fixation, as a batch plays the run with this seed."""
+  if payoff_matrix is not None and lockstepped(args):
+    _, _, (encoded,) = moran.lockstep_trajectories(payoff_matrix, args.initial_pop, [seed])
+    return moran.RecordedProcess([str(cls()) for cls in classes], trajectories.decode(encoded))
+  mp = create_process(args, algos, classes, seed, payoff_matrix)
+  mp.play()
+  return mp
+
+
+def _set_state(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]],
+               classes: tuple[type[common.LLM_Strategy], ...], payoff_matrix: np.ndarray | None) -> None:
+  global _args, _algos, _classes, _payoffs
+  _args, _algos, _classes, _payoffs = args, algos, classes, payoff_matrix
+
+
+def run_chunk(chunk: list[tuple[int, np.random.SeedSequence]]) -> list[tuple[int, str, int, bytes | None]]:
+  """Play the process of each (run, seed), returning the run, winner, length and trajectory of each.
+
+  Trajectories are encoded by evollm.trajectories, or None without --trajectories. Matrix processes
+  of a chunk are run together with moran.lockstep.
+  """
+  assert _args is not None, "The worker state is set by pools.workers"
+  names = [str(cls()) for cls in _classes]
+  if _payoffs is not None and lockstepped(_args):
+    sequences = [seed for _, seed in chunk]
+    encoded: list[bytes] | list[None]
+    if _args.trajectories:
+      winners, lengths, encoded = moran.lockstep_trajectories(_payoffs, _args.initial_pop, sequences)
+    else:
+      (winners, lengths), encoded = moran.lockstep(_payoffs, _args.initial_pop, sequences), [None] * len(chunk)
+    return [(run, names[winner], int(length), trajectory)
+            for (run, _), winner, length, trajectory in zip(chunk, winners.tolist(), lengths, encoded)]
+  results = []
+  for run, seed in chunk:
+    mp = create_process(_args, _algos, _classes, seed, _payoffs)
+    mp.play()
+    trajectory = None
+    if _args.trajectories:
+      populations = mp.populations
+      if _args.fixed_strategies:
+        # Trajectories are kept by attitude
+        attitudes = {s.__name__: str(cls()) for cls in _classes for s in cls.strategies}
+        populations = [Counter({attitude: sum(n for name, n in population.items() if attitudes[name] == attitude)
+                                for attitude in names}) for population in populations]
+      trajectory = trajectories.from_populations(populations, names)
+    results.append((run, mp.winning_strategy_name, len(mp), trajectory))
+  return results
+
+
+@contextlib.contextmanager
+def workers(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]],
+            classes: tuple[type[common.LLM_Strategy], ...], payoff_matrix: np.ndarray | None = None,
+            processes: int = 1, chunksize: int | None = None) -> Iterator[Callable]:
+  """Function running a list of (run, seed), over a process pool kept until exit.
+
+  It yields the run, winner, length and trajectory of every run in order of completion. algos and
+  classes are those already loaded in this process; workers load their own.
+  """
+  def chunks(runs: list[tuple[int, np.random.SeedSequence]]) -> list[list[tuple[int, np.random.SeedSequence]]]:
+    size = pools.chunk_size(len(runs), processes, chunksize)
+    return [runs[i:i + size] for i in range(0, len(runs), size)]
+
+  # The chunks are the unit of work, as the matrix runs of a chunk are played in lockstep
+  with pools.workers(run_chunk, _set_state, load_classes, args, (algos, classes), (payoff_matrix,),
+                     processes, chunksize=1) as play:
+    yield lambda runs: (result for results in play(chunks(runs)) for result in results)
@@ -0,0 +1,47 @@
+"""Expected payoffs between strategies, estimated once from played matches."""
+
+import axelrod as axl
+import numpy as np
+
+from evollm import common, engine, seeds
+
+
+def payoff_matrix(strategies: list[type[axl.Player]], game: axl.Game, turns: int, noise: float = 0,
+                  repetitions: int = 10, seed: int = 1) -> np.ndarray:
+  """Mean payoff per turn of strategies[i] against strategies[j], over repetitions matches each.
+
+  Matches are played with engine.Match, so they go through the fast engine and the match cache
+  when those are installed. Repetition r of every pair uses the same seed, from the PAYOFFS stream.
+  """
+  n = len(strategies)
+  payoffs = np.zeros((n, n))
+  match_seeds = seeds.stream_seeds(seed, seeds.PAYOFFS, range(repetitions))
+  for i in range(n):
+    for j in range(i, n):
+      for match_seed in match_seeds:
+        match = engine.Match((strategies[i](), strategies[j]()), turns=turns, game=game, noise=noise,
+                             seed=match_seed)
+        match.play()
+        score_i, score_j = match.final_score_per_turn()
+        if i == j:
+          payoffs[i, i] += (score_i + score_j) / 2
+        else:
+          payoffs[i, j] += score_i
+          payoffs[j, i] += score_j
+  return payoffs / repetitions
+
+
+def sampler_payoffs(payoffs: np.ndarray, groups: list[list[int]]) -> np.ndarray:
+  """Expected payoffs between samplers that each play a uniformly chosen strategy of their group."""
+  return np.array([[payoffs[np.ix_(x, y)].mean() for y in groups] for x in groups])
+
+
+def attitude_payoffs(classes: tuple[type[common.LLM_Strategy], ...], game: axl.Game, turns: int,
+                     noise: float = 0, repetitions: int = 10, seed: int = 1) -> np.ndarray:
+  """Payoff matrix between the StrategySampler classes of algorithms.create_classes."""
+  strategies = [s for cls in classes for s in cls.strategies]
+  groups, start = [], 0
+  for cls in classes:
+    groups.append(list(range(start, start + len(cls.strategies))))
+    start += len(cls.strategies)
+  return sampler_payoffs(payoff_matrix(strategies, game, turns, noise, repetitions, seed), groups)
@@ -0,0 +1,95 @@
+"""Plot the mean and quantile bands of the population of each attitude over many Moran runs.
+
+Rendering only reads trajectory stores, so restyling a figure never reruns the simulation. Run the
+batch once, in parallel, saving its trajectories:
+  python3 src/evollm/moran_process.py --algo strategies/openai_default --initial_pop 4 4 4 --matrix \
+      --iterations 500 --processes 8 --trajectories results/moran.sqlite
+then plot it, and replot at will:
+  python3 src/evollm/plot_trajectories.py results/moran.sqlite --output results/moran_bands.png
+The stores of the shards of a batch can be given together.
+"""
+
+import argparse
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+from evollm import trajectories
+
+
+def load(paths: list[str]) -> tuple[list[str], list[np.ndarray]]:
+  """Names of the types and trajectories of every run in the stores of the shards of a batch."""
+  names: list[str] | None = None
+  seed, runs = None, {}
+  for path in paths:
+    store = trajectories.TrajectoryStore(path)
+    assert names is None or (store.meta("names"), store.meta("seed")) == (names, seed), \
+        f"{path} is not from the same batch as {paths[0]}"
+    names, seed = store.meta("names"), store.meta("seed")
+    for run in store.runs():
+      assert run not in runs, f"Run {run} of {path} is in several stores"
+      runs[run] = store.get(run)
+    store.close()
+  assert names is not None, "No trajectory stores"
+  return names, [runs[run] for run in sorted(runs)]
+
+
+def bands_plot(names: list[str], runs: list[np.ndarray], quantiles=(0.1, 0.5, 0.9), steps: int | None = None,
+               per_generation: bool = True, ax: plt.Axes | None = None) -> plt.Axes:
+  """Mean of each type with its outer quantiles shaded and its middle quantile dashed."""
+  mean, bands = trajectories.bands(runs, quantiles, steps)
+  # A generation of the Moran process is one step per individual
+  x = np.arange(len(mean)) / (runs[0][0].sum() if per_generation else 1)
+  if ax is None:
+    _, ax = plt.subplots()
+  for i, name in enumerate(names):
+    line, = ax.plot(x, mean[:, i], label=name, linewidth=1)
+    ax.fill_between(x, bands[0, :, i], bands[-1, :, i], color=line.get_color(), alpha=0.2, linewidth=0)
+    if len(quantiles) > 2:
+      ax.plot(x, bands[len(quantiles) // 2, :, i], color=line.get_color(), linestyle="--", linewidth=0.8)
+  ax.set_title(f"Population by {'generation' if per_generation else 'iteration'} over {len(runs)} runs")
+  ax.set_xlabel("Generation" if per_generation else "Iteration")
+  ax.set_ylabel("Number of Individuals")
+  ax.legend()
+  return ax
+
+
+def parse_arguments() -> argparse.Namespace:
+  """Parse command line arguments."""
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument(
+      "stores",
+      nargs="+",
+      help="Trajectory stores of the shards of a batch, from moran_process.py --trajectories")
+  parser.add_argument(
+      "--quantiles",
+      nargs="+",
+      type=float,
+      default=[0.1, 0.5, 0.9],
+      help="Quantiles of the bands: the outer ones are shaded and the middle one dashed")
+  parser.add_argument(
+      "--steps",
+      type=int,
+      help="Only plot this many iterations (default: until the last run fixates)")
+  parser.add_argument(
+      "--iterations",
+      action="store_true",
+      help="Plot against iterations rather than generations of population size iterations")
+  parser.add_argument(
+      "--output",
+      type=str,
+      default="results/moran_bands.png",
+      help="File to save the figure to")
+
+  return parser.parse_args()
+
+
+if __name__ == "__main__":
+  parsed_args = parse_arguments()
+
+  names, runs = load(parsed_args.stores)
+  print(f"{len(runs)} runs")
+  fig, ax = plt.subplots()
+  bands_plot(names, runs, sorted(parsed_args.quantiles), parsed_args.steps, not parsed_args.iterations, ax)
+  fig.set_size_inches(4, 3)
+  fig.savefig(parsed_args.output, dpi=300, bbox_inches='tight')
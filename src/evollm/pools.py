@@ -0,0 +1,42 @@
+"""Persistent process pools whose workers load the strategies once, for moran_worker and ranking.
+
+Each worker installs the match class of the arguments and loads the strategy module itself, then
+keeps them in module-level state for the work function, so only work items and results are pickled
+and the dynamically created classes never cross process boundaries, even under the spawn start
+method. With a single process the same state is set from what the caller already loaded and the
+work runs serially through the same function.
+"""
+
+import argparse
+import contextlib
+from multiprocessing import Pool
+from typing import Callable, Iterator
+
+from evollm import engine
+
+
+def chunk_size(items: int, processes: int, chunksize: int | None = None) -> int:
+  """chunksize, or by default about four chunks per process."""
+  return chunksize or max(1, items // (4 * processes))
+
+
+def initialize(set_state: Callable, load: Callable, args: argparse.Namespace, *extra) -> None:
+  """Pool initializer: install the match class and load the strategies once per worker."""
+  engine.install_args(args)
+  set_state(args, *load(args), *extra)
+
+
+@contextlib.contextmanager
+def workers(function: Callable, set_state: Callable, load: Callable, args: argparse.Namespace, loaded: tuple,
+            extra: tuple = (), processes: int = 1, chunksize: int | None = None) -> Iterator[Callable]:
+  """Function mapping function over a list of items, over a process pool kept until exit.
+
+  The state of every worker is set_state(args, *load(args), *extra), and that of this process
+  set_state(args, *loaded, *extra) without a pool. Results come in order of completion.
+  """
+  if processes > 1:
+    with Pool(processes=processes, initializer=initialize, initargs=(set_state, load, args, *extra)) as pool:
+      yield lambda items: pool.imap_unordered(function, items, chunk_size(len(items), processes, chunksize))
+  else:
+    set_state(args, *loaded, *extra)
+    yield lambda items: map(function, items)
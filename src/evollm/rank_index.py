@@ -0,0 +1,65 @@
+"""Sidecar index of a strategy module, with the ranks and the metadata of its strategies.
+
+rank_strategies.py writes my_strategies_index.json next to my_strategies.py rather than appending
+the *_ranks lists to the module. It holds the hash of the module file, the ranks of each attitude and,
+for every strategy, the lines of its class, its normalised source hash, whether it draws random
+numbers and its score. algorithms.load_algorithms reads the ranks for keep_top and keep_bottom from
+the index without executing the module, then only compiles the classes it selects. An index whose
+hash doesn't match the module file is ignored, and modules with *_ranks lists still load as before.
+"""
+
+import ast
+import hashlib
+import json
+import os
+
+from evollm import common
+
+
+def index_path(module_path: str) -> str:
+  return f"{module_path.removesuffix('.py')}_index.json"
+
+
+def file_hash(module_path: str) -> str:
+  with open(module_path, "rb") as f:
+    return hashlib.sha256(f.read()).hexdigest()
+
+
+def class_lines(source: str) -> dict[str, tuple[int, int]]:
+  """First and last line of every top-level class, including its decorators, by class name."""
+  return {node.name: (min([node.lineno] + [d.lineno for d in node.decorator_list]), node.end_lineno or node.lineno)
+          for node in ast.parse(source).body if isinstance(node, ast.ClassDef)}
+
+
+def write(module_path: str, algos: list[type[common.LLM_Strategy]], ranks: dict[str, list[str]],
+          scores: dict[str, float]) -> str:
+  """Write the index of the module with the ranks by attitude name and scores by strategy name."""
+  with open(module_path, encoding="utf8") as f:
+    lines = class_lines(f.read())
+  index = {
+      "module_hash": file_hash(module_path),
+      "ranks": ranks,
+      "strategies": {a.__name__: {"lines": lines[a.__name__], "source_hash": a.source_hash,
+                                  "deterministic": a.deterministic, "score": scores.get(a.__name__)}
+                     for a in algos if a.__name__ in lines},
+  }
+  path = index_path(module_path)
+  with open(path, "w", encoding="utf8") as f:
+    json.dump(index, f, indent=1)
+  return path
+
+
+def read(module_path: str) -> dict | None:
+  """Index of the module, or None if it has none or the module changed since it was written."""
+  path = index_path(module_path)
+  if not os.path.exists(path):
+    return None
+  with open(path, encoding="utf8") as f:
+    index = json.load(f)
+  return index if index.get("module_hash") == file_hash(module_path) else None
+
+
+def skipped_lines(index: dict, names: list[str]) -> set[int]:
+  """Lines of the classes of the indexed strategies that aren't in names."""
+  return {line for name, strategy in index["strategies"].items() if name not in names
+          for line in range(strategy["lines"][0], strategy["lines"][1] + 1)}
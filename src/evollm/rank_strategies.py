@@ -1,11 +1,13 @@
 import argparse
 from collections import defaultdict
 
-import axelrod as axl
 import pandas as pd
 
 from evollm import algorithms
 from evollm import common
+from evollm import engine
+from evollm import rank_index
+from evollm import ranking
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -17,59 +19,118 @@ def parse_arguments() -> argparse.Namespace:
       type=str,
       required=True,
       help="Name of the python module to call the LLM algorithms")
+  parser.add_argument(
+      "--rewrite",
+      action="store_true",
+      help="Rewrite history slicing in the strategies onto incremental statistics when loading")
+  parser.add_argument(
+      "--fast",
+      action="store_true",
+      help="Play matches with the fast match engine")
+  parser.add_argument(
+      "--cache",
+      type=str,
+      help="SQLite file caching the interactions of every match played, across runs")
+  parser.add_argument(
+      "--cache_entries",
+      type=common.positive_int,
+      default=1_000_000,
+      help="Maximum number of matches kept in the cache")
+  parser.add_argument(
+      "--seed",
+      type=int,
+      default=1,
+      help="Seed of the tournaments")
+  parser.add_argument(
+      "--repetitions",
+      type=common.positive_int,
+      default=3,
+      help="Repetitions of each match of the tournaments")
+  parser.add_argument(
+      "--processes",
+      type=common.positive_int,
+      default=1,
+      help="Number of processes playing the matches of every strategy")
+  parser.add_argument(
+      "--chunksize",
+      type=common.positive_int,
+      help="Number of matches sent to a worker at a time (default: a quarter of the matches per process)")
+  parser.add_argument(
+      "--scores",
+      type=str,
+      help="SQLite file of the scores of every strategy per tournament, so that only new or changed "
+      "strategies are played again (default: the module path with _scores.sqlite)")
+  parser.add_argument(
+      "--race",
+      action="store_true",
+      help="Rank by the mean score over tournaments with different seeds, only playing new tournaments "
+      "for the strategies whose rank isn't settled yet")
+  parser.add_argument(
+      "--min_samples",
+      type=common.positive_int,
+      default=3,
+      help="Tournaments played by every strategy before any is settled with --race")
+  parser.add_argument(
+      "--max_samples",
+      type=common.positive_int,
+      default=10,
+      help="Maximum number of tournaments played by a strategy with --race")
+  parser.add_argument(
+      "--confidence",
+      type=float,
+      default=0.95,
+      help="Confidence level of the intervals of the mean scores with --race")
+  parser.add_argument(
+      "--boundaries",
+      nargs="+",
+      type=float,
+      help="Fractions of the ranking at which strategies must be separated with --race, e.g. 0.5 to only "
+      "find the top half (default: every rank)")
 
-  return parser.parse_args()
+  args = parser.parse_args()
+  if args.min_samples < 2:
+    parser.error("--min_samples must be at least 2 for the confidence intervals of --race")
+  return args
 
 
 def rank_strategies(args: argparse.Namespace):
-  classes = [axl.Cooperator,
-          axl.Defector,
-          axl.Random,
-          axl.TitForTat,
-          axl.Grudger,
-          axl.CyclerDDC,
-          axl.CyclerCCD,
-          axl.GoByMajority,
-          axl.SuspiciousTitForTat,
-          axl.Prober,
-          # axl.OriginalGradual,
-          axl.WinStayLoseShift,
-          ]
-
-  players = [c() for c in classes]
   algo_results: dict[str, dict] = defaultdict(dict)
   ranks = defaultdict(list)
 
-  algos = algorithms.load_algorithms(args.algo)
+  algos = algorithms.load_algorithms(args.algo, rewrite=args.rewrite)
   max_n = max(a.n for a in algos)
 
-  for n in range(1, max_n + 1):
-    for a in algorithms.create_classes(algos, suffix=f"_{n}"):
-      strategy = a()
-      print(strategy.strategies)
-      tournament = axl.Tournament(players + [strategy],
-                                  turns=algos[0].rounds,
-                                  repetitions=3,
-                                  noise=algos[0].noise,
-                                  seed=1,
-                                  game=common.get_game(algos[0].game))
-      results = tournament.play(processes=0)
-      algo_results[strategy.name][n] = results.scores[-1][0]
+  store = ranking.ScoreStore(args.scores or f"{args.algo.removesuffix('.py')}_scores.sqlite")
+  stored = len(store)
+  if args.race:
+    samples = ranking.race(args, algos, args.processes, args.chunksize, store)
+    played = sum(len(s) for s in samples.values())
+    print(f"Sampled {played} of {len(samples) * args.max_samples} tournaments")
+    scores = {candidate: sum(s) / len(s) for candidate, s in samples.items()}
+  else:
+    # Same as the score of each strategy in the tournament of the opponents and the strategy
+    scores = {candidate: s[0]
+              for candidate, s in ranking.schedule(args, algos, args.processes, args.chunksize, store).items()}
+  print(f"Played {len(store) - stored} new tournaments, the others were stored in {store.path}")
+  store.close()
+  for (n, attitude), score in sorted(scores.items()):
+    strategy = algorithms.create_classes(algos, suffix=f"_{n}")[attitude]
+    print(strategy.strategies)
+    algo_results[strategy.name][n] = score
   for k, v in algo_results.items():
     sorted_s = pd.Series(v).sort_values(ascending=False)
     print(k, sorted_s, sep="\n")
     for n in range(max_n):
       ranks[k].append(f"{k}_{sorted_s.index[n]}")
 
-  with open(f"{args.algo}.py", "a", encoding="utf8") as f:
-    for k in ranks:
-      f.write(f"\n\n{k}_ranks = [\n")
-      for r in ranks[k]:
-        f.write(f"'{r}',\n")
-      f.write("]")
+  scores_by_name = {f"{k}_{n}": float(score) for k, v in algo_results.items() for n, score in v.items()}
+  path = rank_index.write(algorithms.module_file(args.algo), algos, dict(ranks), scores_by_name)
+  print(f"Ranks written to {path}")
 
 
 if __name__ == "__main__":
   parsed_args = parse_arguments()
 
+  engine.install_args(parsed_args)
+
   rank_strategies(parsed_args)
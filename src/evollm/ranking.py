@@ -0,0 +1,241 @@
+"""Scores of candidate strategies in a tournament against a fixed block of opponents.
+
+rank_strategies.py scores every candidate in an axl.Tournament of the Beaufils opponents plus the
+candidate. The scores of a player in axl.ResultSet exclude self-interactions, and the seed of every
+match only depends on its position in the round robin, so the candidate's scores only depend on its
+own matches: each candidate only plays its matches against the opponents, with the seeds the full
+tournament would give them.
+
+Those matches are independent, so schedule flattens the matches of every candidate of a module into
+one queue over a persistent process pool. The unit of work is the repetitions of one (candidate,
+opponent) match, since axl.Tournament plays them on the same Match, continuing its generator.
+Workers load the strategies themselves through evollm.pools, so only indices and scores are pickled.
+
+race ranks the candidates with fewer matches: it samples the score of every candidate in independent
+tournaments, one round at a time, and stops sampling a candidate once the confidence intervals of
+the scores show on which side of every rank boundary it falls.
+
+The score of a candidate in a tournament only depends on its strategies and the tournament, so a
+ScoreStore keeps it by the normalised source hashes of the strategies and the parameters of the
+tournament. Regenerating one strategy of a module then only plays the tournaments of its candidate
+again, and the others are ranked with their stored scores.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Callable, Iterator
+
+import axelrod as axl
+import numpy as np
+from scipy import stats
+
+from evollm import algorithms, common, engine, match_cache, pools, seeds
+
+
+def candidate_seeds(opponents: int, seed: int = 1) -> list[int]:
+  """Seed of the match of each opponent against the last player of a tournament of opponents + 1."""
+  tournament = axl.Tournament([axl.Cooperator() for _ in range(opponents + 1)], turns=1, seed=seed)
+  return [chunk.seed for chunk in tournament.match_generator.build_match_chunks()
+          if chunk.index_pair[1] == opponents and chunk.index_pair[0] != opponents]
+
+
+# Set by _set_state in each worker
+_args: argparse.Namespace | None = None
+_algos: list[type[common.LLM_Strategy]] = []
+_classes: dict[int, tuple[type[common.LLM_Strategy], ...]] = {}
+
+
+def _set_state(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]]) -> None:
+  global _args, _algos, _classes
+  _args, _algos, _classes = args, algos, {}
+
+
+def _load(args: argparse.Namespace) -> tuple[list[type[common.LLM_Strategy]]]:
+  return algorithms.load_algorithms(args.algo, rewrite=args.rewrite),
+
+
+def play_match(job: tuple[int, int, int, int, int]) -> tuple[int, int, list[int]]:
+  """Play the repetitions of the match of candidate attitude of strategy n against an opponent.
+
+  job is (n, attitude, opponent, seed, repetitions); returns n, attitude and the candidate score per
+  repetition.
+  """
+  n, attitude, opponent, seed, repetitions = job
+  if n not in _classes:
+    _classes[n] = algorithms.create_classes(_algos, suffix=f"_{n}")
+  players = (common.BEAUFILS_OPPONENTS[opponent](), _classes[n][attitude]())
+  # As axl.Tournament._play_matches
+  match = engine.Match(players, turns=_algos[0].rounds, game=common.get_game(_algos[0].game),
+                       noise=_algos[0].noise, seed=seed)
+  scores = []
+  for _ in range(repetitions):
+    match.play()
+    scores.append(axl.interaction_utils.compute_final_score(match.result, match.game)[1])
+  return n, attitude, scores
+
+
+@contextlib.contextmanager
+def workers(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]], processes: int = 1,
+            chunksize: int | None = None) -> Iterator[Callable]:
+  """Function playing a list of jobs of play_match, over a process pool kept until exit."""
+  with pools.workers(play_match, _set_state, _load, args, (algos,), processes=processes,
+                     chunksize=chunksize) as play:
+    yield play
+
+
+def candidates(algos: list[type[common.LLM_Strategy]]) -> list[tuple[int, int]]:
+  """(n, attitude) of every candidate of a module."""
+  attitudes = len(algorithms.create_classes(algos))
+  return [(n, attitude) for n in range(1, max(a.n for a in algos) + 1) for attitude in range(attitudes)]
+
+
+def candidate_key(algos: list[type[common.LLM_Strategy]], n: int, attitude: int, seed: int,
+                  repetitions: int) -> str | None:
+  """Key of the scores of a candidate in a tournament, or None if its strategies can't be identified."""
+  candidate = match_cache.player_key(algorithms.create_classes(algos, suffix=f"_{n}")[attitude]())
+  if candidate is None:
+    return None
+  opponents = [match_cache.player_key(o()) for o in common.BEAUFILS_OPPONENTS]
+  key = (candidate, opponents, common.get_game(algos[0].game).RPST(), algos[0].rounds, algos[0].noise,
+         seed, repetitions, axl.__version__)
+  return hashlib.sha256(repr(key).encode()).hexdigest()
+
+
+class ScoreStore:
+  """SQLite file of the scores per repetition of candidates, by candidate_key."""
+
+  def __init__(self, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self.path = path
+    self.connection = sqlite3.connect(path, isolation_level=None)
+    self.connection.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, scores TEXT)")
+
+  def get(self, key: str) -> list[int] | None:
+    row = self.connection.execute("SELECT scores FROM scores WHERE key = ?", (key,)).fetchone()
+    return None if row is None else json.loads(row[0])
+
+  def put(self, key: str, scores: list[int]) -> None:
+    self.connection.execute("INSERT OR REPLACE INTO scores VALUES (?, ?)",
+                            (key, json.dumps(np.asarray(scores).tolist())))
+
+  def __len__(self) -> int:
+    return self.connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+  def close(self) -> None:
+    self.connection.close()
+
+
+def play_candidates(play: Callable, algos: list[type[common.LLM_Strategy]], chosen: list[tuple[int, int]],
+                    seed: int, repetitions: int, store: ScoreStore | None = None) -> dict[tuple[int, int], list[int]]:
+  """Score per repetition of the chosen candidates in the tournament with seed.
+
+  Only the matches of the candidates whose scores aren't in the store go to play, from workers.
+  """
+  keys: dict[tuple[int, int], str] = {}
+  scores: dict[tuple[int, int], list[int]] = {}
+  if store is not None:
+    for c in chosen:
+      key = candidate_key(algos, *c, seed, repetitions)
+      if key is not None:
+        keys[c] = key
+        stored = store.get(key)
+        if stored is not None:
+          scores[c] = stored
+  missing = [c for c in chosen if c not in scores]
+  match_seeds = candidate_seeds(len(common.BEAUFILS_OPPONENTS), seed)
+  jobs = [(n, attitude, opponent, match_seed, repetitions)
+          for n, attitude in missing for opponent, match_seed in enumerate(match_seeds)]
+  for n, attitude, match_scores in play(jobs):
+    total = scores.setdefault((n, attitude), [0] * repetitions)
+    for repetition, score in enumerate(match_scores):
+      total[repetition] += score
+  for c in missing:
+    if store is not None and c in keys:
+      store.put(keys[c], scores[c])
+  return scores
+
+
+def schedule(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]], processes: int = 1,
+             chunksize: int | None = None, store: ScoreStore | None = None) -> dict[tuple[int, int], list[int]]:
+  """Score per repetition of the candidate of every (n, attitude) against the Beaufils opponents.
+
+  The same scores as ResultSet.scores of the candidate in the tournament of the opponents and the
+  candidate, with every match of every candidate in one queue.
+  """
+  with workers(args, algos, processes, chunksize) as play:
+    return play_candidates(play, algos, candidates(algos), args.seed, args.repetitions, store)
+
+
+def sample_seed(seed: int, sample: int) -> int:
+  """Tournament seed of a sample of race: the first is the tournament of schedule."""
+  return seed if sample == 0 else seeds.stream_seeds(seed, seeds.RANKING, [sample])[0]
+
+
+def settled(means: np.ndarray, half_widths: np.ndarray, boundaries: list[int]) -> np.ndarray:
+  """Whether the rank of each candidate is known to be on one side of every boundary.
+
+  A boundary c separates the c best candidates from the others. Candidate i has at least the
+  candidates whose interval is entirely above its interval ranked above it, and at most those whose
+  interval reaches above its own.
+  """
+  lower, upper = means - half_widths, means + half_widths
+  surely_above = (lower[None, :] > upper[:, None]).sum(axis=1)
+  maybe_above = (upper[None, :] > lower[:, None]).sum(axis=1) - (half_widths > 0)
+  return np.array([not any(a < c <= m for c in boundaries) for a, m in zip(surely_above, maybe_above)])
+
+
+def half_width(scores: list[int], confidence: float) -> float:
+  """Half width of the Student t confidence interval on the mean of the scores, unbounded below two."""
+  n = len(scores)
+  if n < 2:
+    return float("inf")
+  return float(stats.t.ppf(1 - (1 - confidence) / 2, n - 1) * np.std(scores, ddof=1) / np.sqrt(n))
+
+
+def settled_candidates(samples: dict[tuple[int, int], list[int]], confidence: float,
+                       fractions: list[float] | None = None) -> set[tuple[int, int]]:
+  """Candidates whose rank among those of their attitude is settled at the fractions of the ranking.
+
+  Every rank must be settled if fractions is None.
+  """
+  done = set()
+  for attitude in {a for _, a in samples}:
+    group = sorted(c for c in samples if c[1] == attitude)
+    means = np.array([np.mean(samples[c]) for c in group])
+    half_widths = np.array([half_width(samples[c], confidence) for c in group])
+    ranks = [round(f * len(group)) for f in fractions] if fractions else range(1, len(group))
+    boundaries = sorted(set(ranks) - {0, len(group)})
+    done |= {c for c, d in zip(group, settled(means, half_widths, boundaries)) if d}
+  return done
+
+
+def race(args: argparse.Namespace, algos: list[type[common.LLM_Strategy]], processes: int = 1,
+         chunksize: int | None = None, store: ScoreStore | None = None) -> dict[tuple[int, int], list[int]]:
+  """Sampled scores of every (n, attitude) candidate, sampling until its rank is settled.
+
+  Sample k is the score of the candidate in the tournament with sample_seed(args.seed, k), with one
+  repetition. After args.min_samples samples, a candidate stops being sampled once settled among the
+  candidates of its attitude at the args.boundaries fractions of their ranking (every rank if None)
+  with Student t confidence intervals at args.confidence, or after args.max_samples samples.
+  """
+  samples: dict[tuple[int, int], list[int]] = {c: [] for c in candidates(algos)}
+  active = set(samples)
+  with workers(args, algos, processes, chunksize) as play:
+    for sample in range(args.max_samples):
+      scores = play_candidates(play, algos, sorted(active), sample_seed(args.seed, sample), 1, store)
+      for candidate, (score,) in scores.items():
+        samples[candidate].append(score)
+      if sample + 1 < args.min_samples:
+        continue
+
+      active -= settled_candidates(samples, args.confidence, args.boundaries)
+      print(f"Sample {sample + 1}: {len(active)} candidates left")
+      if not active:
+        break
+  return samples
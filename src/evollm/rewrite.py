@@ -0,0 +1,294 @@
+"""Rewrite generated strategies onto the incremental statistics of the player histories.
+
+Recognised patterns, where H is self.history or opponent.history and stats is H.stats, the
+running counts that evollm.history.ActionHistory keeps:
+  H[s:e].count(X), list(H).count(X)    -> stats.count(X, s, e)
+  X in H[s:e], X not in H[s:e]         -> stats.count(X, s, e) > 0, == 0
+  all/any(v == X for v in H[s:e])      -> stats.all_equal(X, s, e), stats.count(X, s, e) > 0
+  all(H[-i] == X for i in range(1, E)) -> stats.run_at_least(X, E - 1)
+  len(H)                               -> self._rounds_scored
+
+where H[s:e] may also be wrapped in list(...). H.count(X) is left alone, since axl.History has no
+count and the strategy must keep raising AttributeError.
+
+Only methods of LLM_Strategy subclasses whose strategy is wrapped in auto_update_score are
+rewritten, since that is what gives the opponent an ActionHistory and keeps _rounds_scored in step
+with the history.
+"""
+
+import argparse
+import ast
+
+from evollm import equivalence
+
+def _is_pure(node: ast.expr | None) -> bool:
+  """Whether evaluating the expression can be reordered, i.e. it has no side effects."""
+  if node is None or isinstance(node, (ast.Constant, ast.Name)):
+    return True
+  if isinstance(node, ast.Attribute):
+    return _is_pure(node.value)
+  if isinstance(node, ast.UnaryOp):
+    return _is_pure(node.operand)
+  if isinstance(node, ast.BinOp):
+    return _is_pure(node.left) and _is_pure(node.right)
+  if isinstance(node, ast.Call):
+    return (isinstance(node.func, ast.Name) and node.func.id == "len" and not node.keywords
+            and all(_is_pure(a) for a in node.args))
+  return False
+
+
+def _uses(node: ast.AST, name: str) -> bool:
+  return any(isinstance(n, ast.Name) and n.id == name for n in ast.walk(node))
+
+
+def _bound_names(node: ast.FunctionDef) -> set[str]:
+  """Names assigned anywhere inside the function body, including nested scopes."""
+  names = set()
+  for child in node.body:
+    for n in ast.walk(child):
+      if isinstance(n, ast.Name) and isinstance(n.ctx, (ast.Store, ast.Del)):
+        names.add(n.id)
+      elif isinstance(n, ast.arg):
+        names.add(n.arg)
+  return names
+
+
+def _is_llm_strategy(node: ast.ClassDef) -> bool:
+  for base in node.bases:
+    if isinstance(base, ast.Name) and base.id == "LLM_Strategy":
+      return True
+    if isinstance(base, ast.Attribute) and base.attr == "LLM_Strategy":
+      return True
+  return False
+
+
+def _auto_updates(node: ast.ClassDef) -> bool:
+  for item in node.body:
+    if isinstance(item, ast.FunctionDef) and item.name == "strategy":
+      return any(isinstance(d, ast.Name) and d.id == "auto_update_score"
+                 or isinstance(d, ast.Attribute) and d.attr == "auto_update_score"
+                 for d in item.decorator_list)
+  return False
+
+
+class IncrementalRewriter(ast.NodeTransformer):
+  """Replace history slicing in strategy methods with O(1) queries of the history statistics."""
+
+  def __init__(self) -> None:
+    self.rewrites = 0
+    self._in_strategy_class = False
+    self._self: str | None = None
+    # Names of the players whose histories are read
+    self._owners: set[str] = set()
+
+  def rewrite_function(self, node: ast.FunctionDef) -> ast.FunctionDef:
+    """Rewrite a standalone strategy(self, opponent) method."""
+    self._in_strategy_class = True
+    try:
+      return self.visit_FunctionDef(node)
+    finally:
+      self._in_strategy_class = False
+
+  def visit_ClassDef(self, node: ast.ClassDef) -> ast.ClassDef:
+    outer = self._in_strategy_class
+    self._in_strategy_class = _is_llm_strategy(node) and _auto_updates(node)
+    self.generic_visit(node)
+    self._in_strategy_class = outer
+    return node
+
+  def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.FunctionDef:
+    if not self._in_strategy_class or self._self is not None:
+      # Nested functions keep the enclosing method's owners
+      self.generic_visit(node)
+      return node
+
+    args = node.args.posonlyargs + node.args.args
+    if not args:
+      return node
+    # The first two arguments are the player and its opponent, as in strategy(self, opponent)
+    self._owners = {a.arg for a in args[:2]} - _bound_names(node)
+    self._self = args[0].arg if args[0].arg in self._owners else None
+    if self._self is not None:
+      self.generic_visit(node)
+    self._self = None
+    self._owners = set()
+    return node
+
+  def _stats(self, node: ast.expr) -> ast.expr | None:
+    """H.stats for an expression H, self.history or opponent.history, else None."""
+    if (isinstance(node, ast.Attribute) and node.attr == "history" and isinstance(node.value, ast.Name)
+        and node.value.id in self._owners):
+      return ast.Attribute(value=node, attr="stats", ctx=ast.Load())
+    return None
+
+  def _window(self, node: ast.expr) -> tuple[ast.expr, ast.expr, ast.expr] | None:
+    """(stats, start, stop) for H[start:stop] or H, possibly copied with list(...), else None."""
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "list"
+        and len(node.args) == 1 and not node.keywords):
+      node = node.args[0]
+    stats = self._stats(node)
+    if stats is not None:
+      return stats, ast.Constant(None), ast.Constant(None)
+    if isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice):
+      window = node.slice
+      stats = self._stats(node.value)
+      if stats is not None and window.step is None and _is_pure(window.lower) and _is_pure(window.upper):
+        return stats, window.lower or ast.Constant(None), window.upper or ast.Constant(None)
+    return None
+
+  def _call(self, stats: ast.expr, method: str, *args: ast.expr) -> ast.Call:
+    self.rewrites += 1
+    return ast.Call(func=ast.Attribute(value=stats, attr=method, ctx=ast.Load()), args=list(args), keywords=[])
+
+  @staticmethod
+  def _compare(left: ast.expr, op: ast.cmpop, right: int) -> ast.Compare:
+    return ast.Compare(left=left, ops=[op], comparators=[ast.Constant(right)])
+
+  def _generator_pattern(self, name: str, node: ast.GeneratorExp) -> ast.expr | None:
+    if len(node.generators) != 1:
+      return None
+    comp = node.generators[0]
+    if comp.ifs or comp.is_async or not isinstance(comp.target, ast.Name):
+      return None
+    elt, var = node.elt, comp.target.id
+    if not (isinstance(elt, ast.Compare) and len(elt.ops) == 1 and isinstance(elt.ops[0], (ast.Eq, ast.NotEq))):
+      return None
+    equal = isinstance(elt.ops[0], ast.Eq)
+    sides = [(elt.left, elt.comparators[0]), (elt.comparators[0], elt.left)]
+
+    # all(v == X for v in H[s:e]) and friends
+    window = self._window(comp.iter)
+    if window is not None:
+      for item, action in sides:
+        if isinstance(item, ast.Name) and item.id == var and _is_pure(action) and not _uses(action, var):
+          stats, start, stop = window
+          if name == "all" and equal:
+            return self._call(stats, "all_equal", action, start, stop)
+          if name == "any" and not equal:
+            return ast.UnaryOp(op=ast.Not(), operand=self._call(stats, "all_equal", action, start, stop))
+          count = self._call(stats, "count", action, start, stop)
+          return self._compare(count, ast.Gt() if equal else ast.Eq(), 0)
+      return None
+
+    # all(H[-i] == X for i in range(1, k + 1))
+    if not (name == "all" and equal and isinstance(comp.iter, ast.Call) and isinstance(comp.iter.func, ast.Name)
+            and comp.iter.func.id == "range" and len(comp.iter.args) == 2 and not comp.iter.keywords):
+      return None
+    first, end = comp.iter.args
+    if not (isinstance(first, ast.Constant) and first.value == 1 and _is_pure(end)):
+      return None
+    for item, action in sides:
+      if (isinstance(item, ast.Subscript) and isinstance(item.slice, ast.UnaryOp)
+          and isinstance(item.slice.op, ast.USub) and isinstance(item.slice.operand, ast.Name)
+          and item.slice.operand.id == var and _is_pure(action) and not _uses(action, var)):
+        item_stats = self._stats(item.value)
+        if item_stats is None:
+          continue
+        if (isinstance(end, ast.BinOp) and isinstance(end.op, ast.Add) and isinstance(end.right, ast.Constant)
+            and end.right.value == 1):
+          k = end.left
+        elif isinstance(end, ast.Constant) and isinstance(end.value, int):
+          k = ast.Constant(end.value - 1)
+        else:
+          k = ast.BinOp(left=end, op=ast.Sub(), right=ast.Constant(1))
+        return self._call(item_stats, "run_at_least", action, k)
+    return None
+
+  def visit_Call(self, node: ast.Call) -> ast.expr:
+    self.generic_visit(node)
+    if not self._owners or node.keywords:
+      return node
+    func = node.func
+
+    if isinstance(func, ast.Name) and len(node.args) == 1:
+      arg = node.args[0]
+      if func.id == "len" and self._self is not None and self._stats(arg) is not None:
+        self.rewrites += 1
+        return ast.Attribute(value=ast.Name(id=self._self, ctx=ast.Load()), attr="_rounds_scored", ctx=ast.Load())
+      if func.id in ("all", "any") and isinstance(arg, ast.GeneratorExp):
+        return self._generator_pattern(func.id, arg) or node
+
+    if (isinstance(func, ast.Attribute) and func.attr == "count" and len(node.args) == 1 and _is_pure(node.args[0])
+        and self._stats(func.value) is None):
+      window = self._window(func.value)
+      if window is not None:
+        stats, start, stop = window
+        return self._call(stats, "count", node.args[0], start, stop)
+
+    return node
+
+  def visit_Compare(self, node: ast.Compare) -> ast.expr:
+    self.generic_visit(node)
+    if (self._owners and len(node.ops) == 1 and isinstance(node.ops[0], (ast.In, ast.NotIn))
+        and _is_pure(node.left)):
+      window = self._window(node.comparators[0])
+      if window is not None:
+        stats, start, stop = window
+        count = self._call(stats, "count", node.left, start, stop)
+        return self._compare(count, ast.Gt() if isinstance(node.ops[0], ast.In) else ast.Eq(), 0)
+    return node
+
+
+def rewrite_tree(tree: ast.Module) -> tuple[ast.Module, int]:
+  rewriter = IncrementalRewriter()
+  tree = ast.fix_missing_locations(rewriter.visit(tree))
+  return tree, rewriter.rewrites
+
+
+def rewrite_source(source: str) -> str:
+  """Rewrite a whole strategy module."""
+  tree, _ = rewrite_tree(ast.parse(source))
+  return ast.unparse(tree)
+
+
+def rewrite_algorithm(algorithm: str) -> str:
+  """Rewrite a single generated strategy(self, opponent) function, as produced by the LLM."""
+  tree = ast.parse(algorithm)
+  function = tree.body[0]
+  assert isinstance(function, ast.FunctionDef), "Expected a single function definition"
+  tree.body[0] = IncrementalRewriter().rewrite_function(function)
+  return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def parse_arguments() -> argparse.Namespace:
+  """Parse command line arguments."""
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument(
+      "--algo",
+      type=str,
+      required=True,
+      help="Name of the python module with the LLM algorithms")
+  parser.add_argument(
+      "--output",
+      type=str,
+      help="Write the rewritten module to this file")
+  parser.add_argument(
+      "--verify",
+      action="store_true",
+      help="Check that rewritten and original strategies play identical actions")
+  parser.add_argument(
+      "--seeds",
+      nargs="+",
+      type=int,
+      default=[1, 2, 3],
+      help="Match seeds to verify with")
+
+  return parser.parse_args()
+
+
+if __name__ == "__main__":
+  parsed_args = parse_arguments()
+
+  module_path = parsed_args.algo if parsed_args.algo.endswith(".py") else f"{parsed_args.algo}.py"
+  with open(module_path, encoding="utf8") as f:
+    tree, count = rewrite_tree(ast.parse(f.read()))
+  print(f"{count} patterns rewritten in {module_path}")
+
+  if parsed_args.output:
+    with open(parsed_args.output, "w", encoding="utf8") as f:
+      f.write(ast.unparse(tree))
+
+  if parsed_args.verify:
+    divergences = equivalence.check_modules([module_path], ("rewrite",), tuple(parsed_args.seeds))
+    print(f"{len(divergences)} diverging matches")
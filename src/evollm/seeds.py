@@ -0,0 +1,97 @@
+"""Seed management shared by the runners.
+
+Every random stream of a batch is derived from the single --seed with numpy's SeedSequence: the
+seed of run k of a stream is SeedSequence(seed, spawn_key=(stream, k)), the same as
+SeedSequence(seed).spawn()[stream].spawn()[k]. It depends only on the seed, the stream and k, so
+a batch reproduces whatever the number of processes, the chunk size or the number of machines it
+is split over, and the streams of different runs never overlap. NumPy generators are seeded with
+the SeedSequence itself, and its full 128 bits of entropy; axelrod only takes 32-bit seeds, which
+are drawn from it. A run with several consumers of randomness gives each its own child sequence.
+
+To split a batch over machines, give each one a different --shard INDEX COUNT and the same --seed
+and --output pattern, then merge the outputs with
+  python3 src/evollm/seeds.py results/moran_*.json
+"""
+
+import argparse
+import json
+from typing import Iterable
+
+import numpy as np
+
+# Independent streams derived from one seed
+MORAN_RUNS = 0
+PAYOFFS = 1
+WRIGHT_FISHER = 2
+RANKING = 3
+
+
+def stream_sequences(seed: int, stream: int, runs: Iterable[int]) -> list[np.random.SeedSequence]:
+  """SeedSequence of each run of a stream, for NumPy generators."""
+  return [np.random.SeedSequence(seed, spawn_key=(stream, run)) for run in runs]
+
+
+def children(sequence: np.random.SeedSequence, n: int) -> list[np.random.SeedSequence]:
+  """The first n children of a SeedSequence, as sequence.spawn(n) gives them before any other spawn."""
+  return [np.random.SeedSequence(sequence.entropy, spawn_key=sequence.spawn_key + (i,), pool_size=sequence.pool_size)
+          for i in range(n)]
+
+
+def int_seed(sequence: np.random.SeedSequence) -> int:
+  """32-bit seed drawn from a SeedSequence, for axelrod."""
+  return int(sequence.generate_state(1)[0])
+
+
+def stream_seeds(seed: int, stream: int, runs: Iterable[int]) -> list[int]:
+  """32-bit seed of each run of a stream, for axelrod."""
+  return [int_seed(sequence) for sequence in stream_sequences(seed, stream, runs)]
+
+
+def shard(runs: int, index: int, count: int) -> range:
+  """Runs of a batch handled by shard index out of count."""
+  assert 0 <= index < count, f"Shard {index} not in range [0, {count})"
+  return range(index, runs, count)
+
+
+def save_runs(path: str, seed: int, runs: dict[int, list]) -> None:
+  with open(path, "w", encoding="utf8") as f:
+    json.dump({"seed": seed, "runs": {str(run): result for run, result in sorted(runs.items())}}, f)
+
+
+def merge_runs(paths: list[str]) -> tuple[int, dict[int, list]]:
+  """Seed and runs of the shards saved by save_runs, checking that they belong to one batch."""
+  seed: int | None = None
+  runs: dict[int, list] = {}
+  for path in paths:
+    with open(path, encoding="utf8") as f:
+      data = json.load(f)
+    assert seed is None or data["seed"] == seed, f"{path} was run with seed {data['seed']}, not {seed}"
+    seed = data["seed"]
+    for run, result in data["runs"].items():
+      assert int(run) not in runs, f"Run {run} of {path} is in several shards"
+      runs[int(run)] = result
+  assert seed is not None, "No shard outputs"
+  return seed, runs
+
+
+def parse_arguments() -> argparse.Namespace:
+  """Parse command line arguments."""
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument(
+      "outputs",
+      nargs="+",
+      help="Outputs of the shards of a batch")
+
+  return parser.parse_args()
+
+
+if __name__ == "__main__":
+  parsed_args = parse_arguments()
+
+  seed, runs = merge_runs(parsed_args.outputs)
+  winner_counts: dict[str, int] = {}
+  for winner, *_ in runs.values():
+    winner_counts[winner] = winner_counts.get(winner, 0) + 1
+  print(f"{len(runs)} runs with seed {seed}")
+  print(winner_counts)
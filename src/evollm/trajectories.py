@@ -0,0 +1,128 @@
+"""Compact store of the population trajectories of Moran runs, for analysis after the fact.
+
+The counts of the types change by at most one individual each step: one type gains the newborn and
+one loses the replaced individual, or nothing changes when both are of the same type. A trajectory
+is therefore stored as the initial counts and the run-length encoded sequence of (birth, death)
+types of its steps, with (0, 0) for the steps that change nothing, in 8 bytes per run of identical
+steps. The trajectories of a batch go to an SQLite file with the names of the types and the seed,
+one row per run, written by moran_process.py --trajectories.
+"""
+
+import json
+import os
+import sqlite3
+from collections import Counter
+
+import numpy as np
+
+_HEADER = np.dtype("<u4")
+_RUN = np.dtype([("birth", "<u2"), ("death", "<u2"), ("length", "<u4")])
+
+
+def encode_steps(initial, births, deaths) -> bytes:
+  """Trajectory starting from the initial counts with the given birth and death type every step."""
+  births, deaths = np.asarray(births, dtype=np.int64), np.asarray(deaths, dtype=np.int64)
+  unchanged = births == deaths
+  births, deaths = np.where(unchanged, 0, births), np.where(unchanged, 0, deaths)
+  starts = np.flatnonzero(np.r_[True, (births[1:] != births[:-1]) | (deaths[1:] != deaths[:-1])]) \
+      if len(births) else np.zeros(0, dtype=np.int64)
+  runs = np.zeros(len(starts), dtype=_RUN)
+  runs["birth"], runs["death"] = births[starts], deaths[starts]
+  runs["length"] = np.diff(np.r_[starts, len(births)])
+  return np.r_[len(initial), initial].astype(_HEADER).tobytes() + runs.tobytes()
+
+
+def encode(counts: np.ndarray) -> bytes:
+  """Trajectory of the counts of every type at every step, steps x types."""
+  counts = np.asarray(counts, dtype=np.int64)
+  changes = np.diff(counts, axis=0)
+  assert (np.abs(changes).sum(axis=1) <= 2).all() and (changes.sum(axis=1) == 0).all(), \
+      "Counts must change by at most one birth and one death per step"
+  return encode_steps(counts[0], changes.argmax(axis=1), changes.argmin(axis=1))
+
+
+def decode(data: bytes) -> np.ndarray:
+  """Counts of every type at every step, steps x types."""
+  types = int(np.frombuffer(data, _HEADER, 1)[0])
+  initial = np.frombuffer(data, _HEADER, types, offset=_HEADER.itemsize).astype(np.int64)
+  runs = np.frombuffer(data, _RUN, offset=_HEADER.itemsize * (types + 1))
+  changes = np.zeros((int(runs["length"].sum()) + 1, types), dtype=np.int64)
+  steps = np.arange(len(changes) - 1) + 1
+  np.add.at(changes, (steps, np.repeat(runs["birth"], runs["length"])), 1)
+  np.add.at(changes, (steps, np.repeat(runs["death"], runs["length"])), -1)
+  changes[0] = initial
+  return np.cumsum(changes, axis=0)
+
+
+def from_populations(populations: list[Counter], names: list[str]) -> bytes:
+  """Trajectory of the population distributions that axl.MoranProcess and evollm.moran record."""
+  return encode(np.array([[population[name] for name in names] for population in populations]))
+
+
+def length(data: bytes) -> int:
+  """Number of populations of a trajectory, like len() of the process, without decoding it."""
+  types = int(np.frombuffer(data, _HEADER, 1)[0])
+  return int(np.frombuffer(data, _RUN, offset=_HEADER.itemsize * (types + 1))["length"].sum()) + 1
+
+
+class TrajectoryStore:
+  """SQLite file of the encoded trajectory of every run of a batch."""
+
+  def __init__(self, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self.path = path
+    self.connection = sqlite3.connect(path, isolation_level=None)
+    self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    self.connection.execute("CREATE TABLE IF NOT EXISTS runs (run INTEGER PRIMARY KEY, trajectory BLOB)")
+
+  def set_meta(self, names: list[str], seed: int) -> None:
+    """Record the names of the types and the seed, checking them against those already stored."""
+    for key, value in [("names", names), ("seed", seed)]:
+      stored = self.meta(key)
+      assert stored is None or stored == value, f"{self.path} has {key} {stored}, not {value}"
+      self.connection.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+  def meta(self, key: str):
+    row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return None if row is None else json.loads(row[0])
+
+  def put(self, run: int, trajectory: bytes) -> None:
+    self.connection.execute("INSERT OR REPLACE INTO runs VALUES (?, ?)", (run, trajectory))
+
+  def get(self, run: int) -> np.ndarray:
+    row = self.connection.execute("SELECT trajectory FROM runs WHERE run = ?", (run,)).fetchone()
+    if row is None:
+      raise KeyError(run)
+    return decode(row[0])
+
+  def runs(self) -> list[int]:
+    return [run for run, in self.connection.execute("SELECT run FROM runs ORDER BY run")]
+
+  def lengths(self) -> dict[int, int]:
+    """Number of populations of every run, i.e. its fixation time plus one."""
+    return {run: length(data) for run, data in self.connection.execute("SELECT run, trajectory FROM runs")}
+
+  def __len__(self) -> int:
+    return self.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+  def close(self) -> None:
+    self.connection.close()
+
+
+def align(trajectories: list[np.ndarray], steps: int | None = None) -> np.ndarray:
+  """runs x steps x types array of trajectories, each extended with its final counts after fixation."""
+  steps = steps or max(len(t) for t in trajectories)
+  aligned = np.zeros((len(trajectories), steps, trajectories[0].shape[1]), dtype=np.int64)
+  for run, trajectory in enumerate(trajectories):
+    aligned[run, :len(trajectory)] = trajectory[:steps]
+    aligned[run, len(trajectory):] = trajectory[-1]
+  return aligned
+
+
+def bands(trajectories: list[np.ndarray], quantiles=(0.1, 0.5, 0.9),
+          steps: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+  """Mean (steps x types) and quantiles (quantiles x steps x types) of the counts over the runs."""
+  aligned = align(trajectories, steps)
+  return aligned.mean(axis=0), np.quantile(aligned, quantiles, axis=0)
@@ -0,0 +1,73 @@
+import unittest
+
+import axelrod as axl
+
+from evollm import common, engine
+
+
+class Probe(common.LLM_Strategy):
+  """Plays at random, checking the incremental scores and outcomes against the history every move."""
+  name = "Probe"
+  outcome_memory = 8
+
+  def __init__(self) -> None:
+    super().__init__()
+    self.checks = []
+
+  @common.auto_update_score
+  def strategy(self, opponent: axl.Player) -> axl.Action:
+    game = self.match_attributes["game"]
+    own, other = self.history, opponent.history
+    windows = [
+        (own, other),
+        (own[-5:], other[-5:]),
+        (own[2:7], other[2:7]),
+        (own[3:3], other[3:3]),
+        (list(own[-4:]), list(other[-4:])),
+        # Not recognised: misaligned or swapped windows are scored from the actions
+        (own[1:], other[:-1]),
+        (list(own[:3]), list(other[:3])),
+        (other, own),
+        (other[-3:], own[-3:]),
+    ]
+    for player_history, opponent_history in windows:
+      self.checks.append((self.total_scores(player_history, opponent_history),
+                          axl.interaction_utils.compute_final_score(list(zip(player_history, opponent_history)), game)))
+
+    outcomes = list(zip(own, other))
+    for n in range(self.outcome_memory + 1):
+      self.checks.append((self.recent_outcomes(n), outcomes[-n:] if n else []))
+    for outcome in [(a, b) for a in [axl.Action.C, axl.Action.D] for b in [axl.Action.C, axl.Action.D]]:
+      streak = 0
+      while streak < len(outcomes) and outcomes[-1 - streak] == outcome:
+        streak += 1
+      self.checks.append((self.outcome_streak(outcome), streak))
+    return axl.Action.D if self._random.random() < 0.3 else axl.Action.C
+
+
+class TestScores(unittest.TestCase):
+  def play(self, match_class, opponent):
+    probe = Probe()
+    match = match_class((probe, opponent), turns=30, noise=0.1, seed=3)
+    match.play()
+    self.assertGreater(len(probe.checks), 0)
+    for actual, expected in probe.checks:
+      self.assertEqual(actual, expected)
+    return probe
+
+  def test_scores_and_outcomes_match_the_history(self):
+    for match_class in [axl.Match, engine.FastMatch]:
+      for opponent in [axl.Random(), axl.TitForTat(), Probe()]:
+        with self.subTest(match_class=match_class, opponent=opponent):
+          probe = self.play(match_class, opponent)
+          # The last round is only scored when the strategy moves again
+          rounds = list(zip(probe.history, opponent.history))[:probe._rounds_scored]
+          game = probe.match_attributes["game"]
+          self.assertEqual(probe.window_scores(), axl.interaction_utils.compute_final_score(rounds, game))
+          self.assertEqual(probe.recent_scores(5), axl.interaction_utils.compute_final_score(rounds[-5:], game))
+          self.assertEqual(probe.window_scores(4, 4), (0, 0))
+          self.assertEqual(probe.recent_scores(0), (0, 0))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+from evollm import confidence
+
+
+class TestConfidence(unittest.TestCase):
+  def test_wilson(self):
+    low, high = confidence.wilson(10, 100)
+    self.assertAlmostEqual(low, 0.0552, places=4)
+    self.assertAlmostEqual(high, 0.1744, places=4)
+    # Unlike the normal approximation, no runs won still gives an interval of positive width
+    self.assertGreater(confidence.wilson(0, 50)[1], 0)
+    self.assertEqual(confidence.wilson(0, 0), (0, 1))
+
+  def test_intervals(self):
+    winner_intervals = confidence.intervals({"A": 40, "B": 60}, ["A", "B", "C"])
+    self.assertEqual(list(winner_intervals), ["A", "B", "C"])
+    # Bonferroni corrected, so wider than a single interval
+    single = confidence.wilson(40, 100)
+    self.assertLess(winner_intervals["A"][0], single[0])
+    self.assertGreater(winner_intervals["A"][1], single[1])
+    self.assertFalse(confidence.precise(winner_intervals, 0.1))
+    self.assertTrue(confidence.precise(confidence.intervals({"A": 4000, "B": 6000}, ["A", "B", "C"]), 0.1))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+
+from evollm import dynamics
+
+
+class TestReplicator(unittest.TestCase):
+  def test_hawk_dove_mixed_equilibrium(self):
+    # Hawks against doves: the stable mix has equal payoffs, 3 (1 - x) = x + 2 (1 - x)
+    trajectory = dynamics.replicator(np.array([[0, 3], [1, 2]]), [[0.1, 0.9], [0.9, 0.1]])
+    np.testing.assert_allclose(trajectory[-1], 0.5, atol=1e-6)
+    np.testing.assert_allclose(trajectory.sum(axis=2), 1)
+
+  def test_dominated_type_vanishes(self):
+    trajectory = dynamics.replicator(np.array([[1, 1, 1], [2, 2, 2], [1, 1, 1]]), [1, 1, 1])
+    self.assertGreater(trajectory[-1, 0, 1], 0.99)
+
+
+class TestWrightFisher(unittest.TestCase):
+  def test_neutral_fixation(self):
+    winners, generations = dynamics.wright_fisher(np.ones((2, 2)), [5, 15], 4000, seed=1)
+    self.assertAlmostEqual((winners == 0).mean(), 0.25, delta=0.03)
+    self.assertTrue((generations > 0).all())
+
+  def test_max_generations(self):
+    winners, generations = dynamics.wright_fisher(np.ones((2, 2)), [500, 500], 10, seed=1, max_generations=5)
+    np.testing.assert_array_equal(winners, -1)
+    np.testing.assert_array_equal(generations, 5)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,40 @@
+import argparse
+import unittest
+
+import axelrod as axl
+
+from evollm import common, engine
+
+
+class TestEngine(unittest.TestCase):
+  def test_classic_opponents_match_axelrod(self):
+    players = common.BEAUFILS_OPPONENTS + [lambda: axl.GoByMajority(memory_depth=5),
+                                           lambda: axl.GoByMajority(soft=False), lambda: axl.Random(0.2)]
+    for noise in [0, 0.1]:
+      for seed in [1, 2]:
+        for i, first in enumerate(players):
+          for second in players[i:]:
+            expected = axl.Match((first(), second()), turns=50, noise=noise, seed=seed).play()
+            match = axl.Match((first(), second()), turns=50, noise=noise, seed=seed)
+            self.assertEqual(engine.run(match), expected, (match.players, noise, seed))
+            self.assertEqual(match.result, expected)
+
+  def test_unsupported_parameters_are_played_by_the_player(self):
+    self.assertIsNone(engine._inline(axl.GoByMajority(memory_depth=5)))
+    self.assertIsNone(engine._inline(axl.GoByMajority(soft=False)))
+    self.assertIsNotNone(engine._inline(axl.GoByMajority()))
+
+  def test_installed_tournament_matches_axelrod(self):
+    def play():
+      players = [c() for c in common.BEAUFILS_OPPONENTS]
+      return axl.Tournament(players, turns=20, repetitions=2, noise=0.1, seed=4).play(progress_bar=False).scores
+
+    expected = play()
+    self.addCleanup(engine.install, axl.Match)
+    self.assertIs(engine.install_args(argparse.Namespace(fast=True, cache=None)), engine.FastMatch)
+    self.assertIs(axl.tournament.Match, engine.FastMatch)
+    self.assertEqual(play(), expected)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import textwrap
+import unittest
+
+from evollm import common, equivalence
+
+MODULE = textwrap.dedent("""
+import axelrod as axl
+from evollm.common import Attitude, auto_update_score, LLM_Strategy
+
+
+class Aggressive_1(LLM_Strategy):
+  attitude = Attitude.AGGRESSIVE
+  game = 'classic'
+  rounds = 5
+  noise = 0.1
+
+  @auto_update_score
+  def strategy(self, opponent):
+    return axl.Action.D if opponent.history[-2:].count(axl.Action.C) else axl.Action.C
+
+
+class Cooperative_1(Aggressive_1):
+  attitude = Attitude.COOPERATIVE
+
+  @auto_update_score
+  def strategy(self, opponent):
+    if len(self.history) == 2:
+      raise ValueError("fails the same way on every path")
+    return axl.Action.C
+
+
+class Neutral_1(Aggressive_1):
+  attitude = Attitude.NEUTRAL
+  moves = 0
+
+  @auto_update_score
+  def strategy(self, opponent):
+    # Shared by every match in the process: only the first one runs to the end
+    Neutral_1.moves += 1
+    if Neutral_1.moves > self.rounds:
+      raise ValueError("drifted")
+    return axl.Action.C
+""")
+
+
+class TestEquivalence(unittest.TestCase):
+  def test_exceptions_are_compared(self):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "toy.py")
+      with open(path, "w", encoding="utf8") as f:
+        f.write(MODULE)
+      divergences = equivalence.check_modules([path], variants=("engine",), seeds=(1, 2))
+
+    # Only the engine replay of the first match of Neutral_1 raises where the reference didn't
+    first_opponent = common.BEAUFILS_OPPONENTS[0].__name__
+    self.assertEqual(divergences, [equivalence.Divergence(path, "Neutral_1", first_opponent, 1, "engine", 0,
+                                                          "no error vs ValueError: drifted")])
+
+
+if __name__ == "__main__":
+  unittest.main()
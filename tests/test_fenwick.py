@@ -0,0 +1,32 @@
+import random
+import unittest
+
+from evollm.fenwick import FenwickTree
+
+
+class TestFenwickTree(unittest.TestCase):
+  def test_prefix_and_find(self):
+    rng = random.Random(1)
+    weights = [rng.randrange(4) for _ in range(37)]
+    tree = FenwickTree(weights)
+    for _ in range(200):
+      i = rng.randrange(len(weights))
+      delta = rng.randrange(-weights[i], 4)
+      weights[i] += delta
+      tree.add(i, delta)
+      for stop in range(len(weights) + 1):
+        self.assertEqual(tree.prefix(stop), sum(weights[:stop]))
+      for value in range(sum(weights)):
+        # The first index whose cumulative weight exceeds value
+        i = tree.find(value)
+        self.assertTrue(sum(weights[:i]) <= value < sum(weights[:i + 1]))
+
+  def test_sample_skips_empty(self):
+    tree = FenwickTree([0, 2, 0, 1, 0])
+    self.assertEqual({tree.sample(r / 30) for r in range(30)}, {1, 3})
+    tree[1] = 0
+    self.assertEqual(tree.sample(0.999), 3)
+
+
+if __name__ == "__main__":
+  unittest.main()
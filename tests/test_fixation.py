@@ -0,0 +1,36 @@
+import unittest
+
+import numpy as np
+
+from evollm import fixation
+
+
+class TestFixation(unittest.TestCase):
+  def test_compositions(self):
+    states = fixation.compositions(4, 3)
+    self.assertEqual(len(states), 15)
+    self.assertTrue((states.sum(axis=1) == 4).all())
+    self.assertEqual(len({tuple(s) for s in states}), 15)
+    self.assertEqual([tuple(s) for s in states], sorted(tuple(s) for s in states))
+
+  def test_neutral(self):
+    probabilities, steps = fixation.fixation(np.ones((3, 3)), [1, 2, 3])
+    np.testing.assert_allclose(probabilities, [1 / 6, 2 / 6, 3 / 6])
+    self.assertGreater(steps, 0)
+
+  def test_constant_fitness(self):
+    # Payoffs that don't depend on the opponent give the classic fixation probability of a mutant
+    r, n = 2.0, 10
+    payoffs = np.array([[r, r], [1, 1]])
+    # Fitness excludes self-play, so both types lose one payoff against themselves equally
+    probabilities, _ = fixation.fixation(payoffs, [1, n - 1])
+    self.assertAlmostEqual(probabilities[0], (1 - 1 / r) / (1 - 1 / r ** n))
+
+  def test_absorbing(self):
+    probabilities, steps = fixation.fixation(np.eye(3), [0, 5, 0])
+    np.testing.assert_allclose(probabilities, [0, 1, 0])
+    self.assertEqual(steps, 0)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+
+from evollm import graphs
+
+
+class TestGraphs(unittest.TestCase):
+  def check_graph(self, adjacency, nodes):
+    self.assertEqual(adjacency.shape, (nodes, nodes))
+    self.assertEqual((adjacency != adjacency.T).nnz, 0)
+    self.assertEqual(adjacency.diagonal().sum(), 0)
+    self.assertEqual(adjacency.max(), 1)
+
+  def test_lattice(self):
+    adjacency = graphs.create("lattice", 25)
+    self.check_graph(adjacency, 25)
+    np.testing.assert_array_equal(np.diff(adjacency.indptr), 4)
+    self.assertEqual(list(adjacency[0].indices), [1, 4, 5, 20])
+
+  def test_random_graphs(self):
+    for kind in ["small_world", "scale_free"]:
+      adjacency = graphs.create(kind, 1000, seed=1)
+      self.check_graph(adjacency, 1000)
+      self.assertAlmostEqual(adjacency.nnz / 1000, 4, delta=0.1)
+      self.assertEqual((graphs.create(kind, 1000, seed=1) != adjacency).nnz, 0)
+    # Preferential attachment gives hubs
+    self.assertGreater(np.diff(graphs.scale_free(1000, seed=1).indptr).max(), 30)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,89 @@
+import random
+import unittest
+
+import axelrod as axl
+
+from evollm.history import ActionHistory, HistoryStats
+
+
+def random_history(length: int) -> list[axl.Action]:
+  return [random.choice([axl.Action.C, axl.Action.D]) for _ in range(length)]
+
+
+class TestHistoryStats(unittest.TestCase):
+  def setUp(self):
+    random.seed(0)
+
+  def test_count_matches_slicing(self):
+    for _ in range(50):
+      history = random_history(random.randint(0, 20))
+      stats = HistoryStats()
+      for action in history:
+        stats.append(action)
+      self.assertEqual(len(stats), len(history))
+      for start in [None] + list(range(-22, 22)):
+        for stop in [None] + list(range(-22, 22)):
+          for action in [axl.Action.C, axl.Action.D]:
+            self.assertEqual(stats.count(action, start, stop), history[start:stop].count(action))
+
+  def test_recent(self):
+    history = random_history(30)
+    stats = HistoryStats()
+    for action in history:
+      stats.append(action)
+    for n in range(1, 35):
+      self.assertEqual(stats.recent_defections(n), history[-n:].count(axl.Action.D))
+      self.assertEqual(stats.recent_cooperations(n), history[-n:].count(axl.Action.C))
+    self.assertEqual(stats.recent_defections(0), 0)
+
+  def test_streak(self):
+    stats = HistoryStats()
+    self.assertEqual(stats.streak(axl.Action.C), 0)
+    for action in [axl.Action.C, axl.Action.D, axl.Action.D, axl.Action.D]:
+      stats.append(action)
+    self.assertEqual(stats.streak(axl.Action.D), 3)
+    self.assertEqual(stats.streak(axl.Action.C), 0)
+
+
+class TestActionHistory(unittest.TestCase):
+  def setUp(self):
+    random.seed(0)
+    self.plays = random_history(20)
+    self.history = ActionHistory()
+    for play in self.plays:
+      self.history.append(play, axl.Action.C)
+
+  def test_slices_behave_like_lists(self):
+    for start in [None] + list(range(-22, 22)):
+      for stop in [None] + list(range(-22, 22)):
+        view, expected = self.history[start:stop], self.plays[start:stop]
+        self.assertEqual(len(view), len(expected))
+        self.assertEqual(list(view), expected)
+        self.assertTrue(view == expected)
+        self.assertFalse(view != expected)
+        self.assertEqual(view.count(axl.Action.D), expected.count(axl.Action.D))
+        self.assertEqual(axl.Action.C in view, axl.Action.C in expected)
+        self.assertEqual(list(zip(view, view)), list(zip(expected, expected)))
+        self.assertEqual(list(view[1:-1]), expected[1:-1])
+        self.assertEqual(view[::-1], expected[::-1])
+        for i in range(-len(expected), len(expected)):
+          self.assertEqual(view[i], expected[i])
+
+  def test_comparison_with_repeated_actions(self):
+    self.history.append(axl.Action.D, axl.Action.C)
+    self.history.append(axl.Action.D, axl.Action.C)
+    self.history.append(axl.Action.D, axl.Action.C)
+    self.assertTrue(self.history[-3:] == [axl.Action.D] * 3)
+    self.assertIn(self.history[-2:], [[axl.Action.C] * 2, [axl.Action.D] * 2])
+
+  def test_views_are_snapshots(self):
+    view = self.history[-5:]
+    expected = self.plays[-5:]
+    self.history.append(axl.Action.D, axl.Action.D)
+    self.assertEqual(view, expected)
+    with self.assertRaises(IndexError):
+      view[5]
+
+
+if __name__ == "__main__":
+  unittest.main()
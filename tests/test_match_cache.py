@@ -0,0 +1,58 @@
+import argparse
+import os
+import tempfile
+import unittest
+
+import axelrod as axl
+
+from evollm import common, engine, match_cache
+
+
+class TestMatchCache(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.cache = match_cache.MatchCache(os.path.join(self.directory.name, "matches.sqlite"))
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def play(self, match_class, seed):
+    match = match_class((axl.Random(), axl.TitForTat()), turns=20, noise=0.1, seed=seed)
+    return [match.play() for _ in range(3)] + [match._random.random()]
+
+  def test_round_trip(self):
+    interactions = [(axl.Action.C, axl.Action.D), (axl.Action.D, axl.Action.D), (axl.Action.C, axl.Action.C)]
+    self.assertEqual(match_cache.decode(match_cache.encode(interactions)), interactions)
+
+  def test_hits_reproduce_matches(self):
+    expected = self.play(axl.Match, 1)
+    cached = match_cache.cached(axl.Match, self.cache)
+    self.assertEqual(self.play(cached, 1), expected)
+    self.assertEqual(self.cache.misses, 3)
+    self.assertEqual(self.play(cached, 1), expected)
+    self.assertEqual(self.cache.hits, 3)
+
+  def test_eviction(self):
+    cache = match_cache.MatchCache(self.cache.path, max_entries=2)
+    for i in range(4):
+      cache.put(str(i), [])
+      self.assertLessEqual(len(cache), 2)
+    cache.put("3", [(axl.Action.C, axl.Action.C)])
+    self.assertEqual(len(cache), 2)
+    self.assertIsNone(cache.get("0"))
+    self.assertEqual(cache.get("3"), [(axl.Action.C, axl.Action.C)])
+    # The count is shared with the other connections to the file
+    self.assertEqual(len(self.cache), 2)
+
+  def test_installed_tournament_fills_the_cache(self):
+    path = os.path.join(self.directory.name, "tournament.sqlite")
+    self.addCleanup(engine.install, axl.Match)
+    engine.install_args(argparse.Namespace(fast=True, cache=path, cache_entries=1000))
+    players = [c() for c in common.BEAUFILS_OPPONENTS[:4]]
+    axl.Tournament(players, turns=10, repetitions=2, seed=1).play(progress_bar=False)
+    # Every seeded match, one per pair and repetition
+    self.assertEqual(len(match_cache.MatchCache(path)), 2 * len(players) * (len(players) + 1) // 2)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,179 @@
+import ast
+import argparse
+import unittest
+from collections import Counter
+
+import axelrod as axl
+import numpy as np
+
+from evollm import algorithms, common, fixation, graphs, moran, moran_worker, seeds
+
+
+class TestMatrixMoranProcess(unittest.TestCase):
+  def test_populations(self):
+    mp = moran.MatrixMoranProcess(np.array([[3, 0], [5, 1]]), ["C", "D"], [3, 2], seed=1)
+    populations = mp.play()
+    self.assertEqual(populations[0], {"C": 3, "D": 2})
+    self.assertTrue(all(sum(p.values()) == 5 for p in populations))
+    self.assertEqual(len(populations[-1]), 1)
+    self.assertEqual(mp.winning_strategy_name, next(iter(populations[-1])))
+    self.assertEqual(len(mp), len(populations))
+
+  def test_neutral_fixation(self):
+    # With equal payoffs a type fixates with probability equal to its initial share
+    wins = sum(moran.MatrixMoranProcess(np.ones((2, 2)), ["A", "B"], [1, 3], seed=seed).play()[-1]["A"] > 0
+               for seed in range(2000))
+    self.assertAlmostEqual(wins / 2000, 0.25, delta=0.03)
+
+
+class TestLockstep(unittest.TestCase):
+  def test_fixation_matches_exact(self):
+    payoffs = np.array([[1, 5, 2], [0, 3, 1], [4, 2, 2]])
+    probabilities, steps = fixation.fixation(payoffs, [3, 2, 2])
+    winners, lengths = moran.lockstep(payoffs, [3, 2, 2], list(range(10000)))
+    np.testing.assert_allclose(np.bincount(winners, minlength=3) / 10000, probabilities, atol=0.02)
+    self.assertAlmostEqual((lengths - 1).mean() / steps, 1, delta=0.05)
+
+  def test_replicates_are_independent(self):
+    payoffs = np.array([[3, 0], [5, 1]])
+    winners, lengths = moran.lockstep(payoffs, [5, 5], list(range(20)))
+    for start in [0, 7, 19]:
+      w, l = moran.lockstep(payoffs, [5, 5], list(range(start, 20)), block=3)
+      np.testing.assert_array_equal(w, winners[start:])
+      np.testing.assert_array_equal(l, lengths[start:])
+
+  def test_plotted_run_is_the_batch_run(self):
+    payoffs = np.array([[3, 0], [5, 1]])
+    args = argparse.Namespace(sampled=False, graph=None, initial_pop=[5, 5])
+    seed = np.random.SeedSequence(4, spawn_key=(0, 0))
+    winners, lengths = moran.lockstep(payoffs, [5, 5], [seed])
+    mp = moran_worker.play_run(args, [], (axl.Cooperator, axl.Defector), seed, payoffs)
+    self.assertEqual(mp.winning_strategy_name, ["Cooperator", "Defector"][winners[0]])
+    self.assertEqual(len(mp), lengths[0])
+    self.assertEqual(mp.populations[0], {"Cooperator": 5, "Defector": 5})
+
+
+class TestSampledMoranProcess(unittest.TestCase):
+  def test_fixation_matches_exact(self):
+    payoffs = np.array([[1, 5, 2], [0, 3, 1], [4, 2, 2]])
+    probabilities, _ = fixation.fixation(payoffs, [3, 2, 2])
+    wins = Counter()
+    for seed in range(2000):
+      mp = moran.SampledMoranProcess(payoffs, ["a", "b", "c"], [3, 2, 2], seed=seed, record=False)
+      mp.play()
+      wins[mp.winning_strategy_name] += 1
+    np.testing.assert_allclose([wins[name] / 2000 for name in "abc"], probabilities, atol=0.03)
+
+  def test_populations(self):
+    mp = moran.SampledMoranProcess(np.array([[3, 0], [5, 1]]), ["C", "D"], [3, 2], seed=1)
+    populations = mp.play()
+    self.assertTrue(all(sum(p.values()) == 5 for p in populations))
+    self.assertEqual(populations[-1], {mp.winning_strategy_name: 5})
+    self.assertEqual(len(mp), len(populations))
+
+  def test_zero_payoffs(self):
+    # Every pair is rejected, so births fall back to uniform
+    mp = moran.SampledMoranProcess(np.array([[0, 0], [0, 1]]), ["A", "B"], [2, 1], seed=2, record=False)
+    mp.play()
+    self.assertTrue(mp.fixation_check())
+
+
+class TestGraphMoranProcess(unittest.TestCase):
+  def test_complete_graph_is_well_mixed(self):
+    payoffs = np.array([[1, 5, 2], [0, 3, 1], [4, 2, 2]])
+    probabilities, _ = fixation.fixation(payoffs, [3, 2, 2])
+    complete = graphs.from_edges(7, *np.triu_indices(7, 1))
+    wins = Counter()
+    for seed in range(2000):
+      mp = moran.GraphMoranProcess(payoffs, ["a", "b", "c"], [0, 0, 0, 1, 1, 2, 2], complete, seed=seed, record=False)
+      mp.play()
+      wins[mp.winning_strategy_name] += 1
+    np.testing.assert_allclose([wins[name] / 2000 for name in "abc"], probabilities, atol=0.03)
+
+  def test_fitness_over_neighbours(self):
+    payoffs = np.array([[1, 5, 2], [0, 3, 1], [4, 2, 2]])
+    adjacency = graphs.create("small_world", 100, seed=1)
+    mp = moran.GraphMoranProcess(payoffs, ["a", "b", "c"], np.arange(100) % 3, adjacency, seed=1)
+    for _ in range(150):
+      next(mp)
+      expected = [sum(payoffs[mp.types[i], mp.types[j]] for j in adjacency[i].indices) for i in range(100)]
+      np.testing.assert_allclose(mp.fitness, expected)
+      self.assertEqual(mp.populations[-1], Counter(mp.names[t] for t in mp.types))
+
+
+class TestMemoisedMoranProcess(unittest.TestCase):
+  def test_same_runs_as_axelrod(self):
+    classes = [axl.Cooperator, axl.Defector, axl.TitForTat, axl.Grudger, axl.Alternator]
+    memo = moran.FitnessMemo()
+    for seed in range(3):
+      expected = axl.MoranProcess([cls() for cls in classes * 2], turns=20, seed=seed)
+      mp = moran.MemoisedMoranProcess([cls() for cls in classes * 2], turns=20, seed=seed, memo=memo)
+      self.assertTrue(mp.memoised)
+      self.assertEqual(mp.play(), expected.play())
+      for scores, expected_scores in zip(mp.score_history, expected.score_history):
+        np.testing.assert_allclose(scores, expected_scores)
+    self.assertGreater(memo.hits, memo.misses)
+
+  def test_stochastic_players_are_not_memoised(self):
+    self.assertFalse(moran.MemoisedMoranProcess([axl.Random(), axl.Defector()], turns=5, seed=1).memoised)
+    self.assertFalse(moran.MemoisedMoranProcess([axl.Cooperator(), axl.Defector()], turns=5, noise=0.1, seed=1).memoised)
+    algos = algorithms.load_algorithms("strategies/openai_default")
+    samplers = algorithms.create_classes(algos)
+    self.assertFalse(moran.deterministic(samplers[0]()))
+    self.assertTrue(any(moran.deterministic(a()) for a in algos))
+    self.assertFalse(all(moran.deterministic(a()) for a in algos))
+
+  def test_random_classes(self):
+    source = (
+        "import random\n"
+        "class A:\n  def strategy(self, opponent):\n    return self._random.random_choice(0.1)\n"
+        "class B:\n  def strategy(self, opponent):\n    return C\n"
+        "class D:\n  def strategy(self, opponent):\n    return random.choice([C, D])\n")
+    self.assertEqual(algorithms.random_classes(ast.parse(source)), {"A", "D"})
+
+  def test_memo_is_bounded(self):
+    memo = moran.FitnessMemo(max_entries=2)
+    for key in "abc":
+      memo.put(key, {key: 1.0})
+    self.assertEqual(len(memo), 2)
+    self.assertIsNone(memo.get("a"))
+    self.assertEqual(memo.get("c"), {"c": 1.0})
+
+
+class TestIncrementalMoranProcess(unittest.TestCase):
+  def test_fitness_matches_full_replay(self):
+    players = [cls() for cls in [axl.Cooperator, axl.Defector, axl.TitForTat, axl.Grudger, axl.Cooperator] * 2]
+    mp = moran.IncrementalMoranProcess(players, turns=10, seed=3)
+    for _ in mp:
+      # Deterministic players, so replaying every match gives the same scores
+      for i, p1 in enumerate(mp.players):
+        for j, p2 in enumerate(mp.players):
+          if i != j:
+            match = axl.Match((p1.clone(), p2.clone()), turns=10)
+            match.play()
+            self.assertEqual(mp.scores[i, j], match.final_score_per_turn()[0])
+      np.testing.assert_allclose(mp.fitness, mp.scores.sum(axis=1))
+      self.assertEqual(mp.populations[-1], Counter(str(p) for p in mp.players))
+    self.assertTrue(mp.fixation_check())
+    self.assertEqual(mp.winning_strategy_name, str(mp.players[0]))
+
+  def test_fixed_strategies_and_process_have_their_own_streams(self):
+    algos = algorithms.load_algorithms("strategies/openai_default")
+    classes = algorithms.create_classes(algos)
+    args = argparse.Namespace(fixed_strategies=True, incremental=True, initial_pop=[2, 2, 2], graph=None, sampled=False)
+    seed = np.random.SeedSequence(4, spawn_key=(0, 0))
+    strategy_seed, process_seed = seeds.children(seed, 2)
+    mp = moran_worker.create_process(args, algos, classes, seed)
+    self.assertEqual([str(p) for p in mp.players],
+                     [str(p) for p in moran_worker.fixed_players(classes, [2, 2, 2], strategy_seed)])
+    expected = moran.IncrementalMoranProcess(moran_worker.fixed_players(classes, [2, 2, 2], strategy_seed),
+                                             turns=algos[0].rounds, noise=algos[0].noise,
+                                             game=common.get_game(algos[0].game), seed=process_seed)
+    self.assertEqual(mp._random.bit_generator.state, expected._random.bit_generator.state)
+    # The process no longer draws the same numbers as the strategies
+    self.assertNotEqual(np.random.default_rng(strategy_seed).integers(2**32, size=4).tolist(),
+                        np.random.default_rng(process_seed).integers(2**32, size=4).tolist())
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from evollm import algorithms, rank_index
+
+
+class TestRankIndex(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, "strategies.py")
+    shutil.copy("strategies/openai_default.py", self.path)
+    self.module = algorithms.load_module(self.path)
+    self.algos = algorithms.load_algorithms(self.path)
+    self.ranks = {name: getattr(self.module, f"{name}_ranks") for name in ["Aggressive", "Cooperative", "Neutral"]}
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def describe(self, algos):
+    return sorted((a.__name__, a.source_hash, a.deterministic) for a in algos)
+
+  def test_index_selects_like_the_ranks_in_the_module(self):
+    expected = self.describe(algorithms.load_algorithms(self.path, 0.2, 0.6))
+    rank_index.write(self.path, self.algos, self.ranks, {})
+    self.assertIsNotNone(rank_index.read(self.path))
+    self.assertEqual(self.describe(algorithms.load_algorithms(self.path, 0.2, 0.6)), expected)
+
+  def test_only_selected_classes_are_compiled(self):
+    rank_index.write(self.path, self.algos, self.ranks, {})
+    index = rank_index.read(self.path)
+    names = algorithms.kept(list(index["ranks"].values()), 0, 0.2)
+    module = algorithms.load_module(self.path, skipped_lines=rank_index.skipped_lines(index, names))
+    self.assertEqual(sorted(a.__name__ for a in algorithms.strategy_classes(module)), sorted(names))
+
+  def test_changed_module_ignores_the_index(self):
+    rank_index.write(self.path, self.algos, {name: ranks[::-1] for name, ranks in self.ranks.items()}, {})
+    with open(self.path, "a", encoding="utf8") as f:
+      f.write("\n# Edited\n")
+    self.assertIsNone(rank_index.read(self.path))
+    self.assertEqual(self.describe(algorithms.load_algorithms(self.path, 0, 0.2)),
+                     self.describe(a for a in self.algos if a.__name__ in algorithms.kept(self.ranks.values(), 0, 0.2)))
+
+  def test_selecting_without_ranks_asks_to_rank_first(self):
+    with open(self.path, encoding="utf8") as f:
+      source = f.read()
+    with open(self.path, "w", encoding="utf8") as f:
+      f.write(source[:source.index("Aggressive_ranks = [")])
+    with self.assertRaisesRegex(ValueError, "rank_strategies.py"):
+      algorithms.load_algorithms(self.path, 0, 0.2)
+    self.assertEqual(len(algorithms.load_algorithms(self.path)), len(self.algos))
+    rank_index.write(self.path, self.algos, self.ranks, {})
+    self.assertEqual(self.describe(algorithms.load_algorithms(self.path, 0, 0.2)),
+                     self.describe(a for a in self.algos if a.__name__ in algorithms.kept(self.ranks.values(), 0, 0.2)))
+
+
+if __name__ == "__main__":
+  unittest.main()
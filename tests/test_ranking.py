@@ -0,0 +1,96 @@
+import argparse
+import os
+import tempfile
+import unittest
+
+import axelrod as axl
+import numpy as np
+
+from evollm import algorithms, common, engine, ranking
+
+
+class TestRanking(unittest.TestCase):
+  def test_schedule(self):
+    args = argparse.Namespace(algo="strategies/openai_default", rewrite=False, fast=True, cache=None,
+                              cache_entries=1, seed=2, repetitions=2)
+    algos = [a for a in algorithms.load_algorithms(args.algo) if a.n == 1]
+    expected = {}
+    for attitude, cls in enumerate(algorithms.create_classes(algos, suffix="_1")):
+      # The full tournament of the opponents and the candidate, with the stock axl.Match
+      tournament = axl.Tournament([c() for c in common.BEAUFILS_OPPONENTS] + [cls()],
+                                  game=common.get_game(algos[0].game), turns=algos[0].rounds,
+                                  repetitions=args.repetitions, noise=algos[0].noise, seed=args.seed)
+      expected[(1, attitude)] = tournament.play(progress_bar=False).scores[-1]
+
+    engine.install(engine.FastMatch)
+    self.addCleanup(engine.install, axl.Match)
+    self.assertEqual(ranking.schedule(args, algos), expected)
+    self.assertEqual(ranking.schedule(args, algos, processes=2, chunksize=5), expected)
+
+  def test_settled(self):
+    means, half_widths = np.array([11., 8., 7.5, 3.]), np.array([1., 1., 1., 0.])
+    # 8 and 7.5 overlap, so their order is unknown, but both are second or third
+    self.assertEqual(ranking.settled(means, half_widths, [1, 2, 3]).tolist(), [True, False, False, True])
+    self.assertEqual(ranking.settled(means, half_widths, [1, 3]).tolist(), [True, True, True, True])
+    self.assertEqual(ranking.settled(np.array([5., 5.]), np.zeros(2), [1]).tolist(), [True, True])
+
+  def test_close_candidates_need_more_samples(self):
+    close = {(1, 0): [10, 11, 12], (2, 0): [7, 8, 9]}
+    # Normal intervals would already separate them after three samples
+    z = 1.96 * np.std(close[(1, 0)], ddof=1) / np.sqrt(3)
+    self.assertTrue(ranking.settled(np.array([11., 8.]), np.array([z, z]), [1]).all())
+    self.assertEqual(ranking.settled_candidates(close, 0.95), set())
+    self.assertEqual(ranking.settled_candidates({c: s * 3 for c, s in close.items()}, 0.95), set(close))
+    self.assertEqual(ranking.settled_candidates({**close, (1, 1): [5, 6, 7]}, 0.95, [0.5]), {(1, 1)})
+
+  def test_one_sample_is_never_settled(self):
+    self.assertEqual(ranking.half_width([10], 0.95), float("inf"))
+    self.assertEqual(ranking.settled_candidates({(1, 0): [20], (2, 0): [5]}, 0.95), set())
+
+  def test_race(self):
+    engine.install(engine.FastMatch)
+    self.addCleanup(engine.install, axl.Match)
+    args = argparse.Namespace(algo="strategies/openai_default", rewrite=False, fast=True, cache=None,
+                              cache_entries=1, seed=2, repetitions=1, min_samples=2, max_samples=3,
+                              confidence=0.95, boundaries=None)
+    algos = [a for a in algorithms.load_algorithms(args.algo) if a.n <= 2]
+    samples = ranking.race(args, algos)
+    self.assertEqual(set(samples), set(ranking.candidates(algos)))
+    # The first sample is the tournament of schedule
+    first = {candidate: s[0] for candidate, s in samples.items()}
+    self.assertEqual(first, {c: s[0] for c, s in ranking.schedule(args, algos).items()})
+    for s in samples.values():
+      self.assertIn(len(s), [2, 3])
+    self.assertEqual(ranking.race(args, algos, processes=2), samples)
+
+  def test_stored_scores(self):
+    engine.install(engine.FastMatch)
+    self.addCleanup(engine.install, axl.Match)
+    args = argparse.Namespace(algo="strategies/openai_default", rewrite=False, fast=True, cache=None,
+                              cache_entries=1, seed=2, repetitions=1)
+    algos = [a for a in algorithms.load_algorithms(args.algo) if a.n == 1]
+    expected = ranking.schedule(args, algos)
+    with tempfile.TemporaryDirectory() as directory:
+      store = ranking.ScoreStore(os.path.join(directory, "scores.sqlite"))
+      self.assertEqual(ranking.schedule(args, algos, store=store), expected)
+      self.assertEqual(len(store), len(expected))
+
+      played = []
+      def play(jobs):
+        played.extend((n, attitude) for n, attitude, *_ in jobs)
+        return map(ranking.play_match, jobs)
+      self.assertEqual(ranking.play_candidates(play, algos, sorted(expected), 2, 1, store), expected)
+      self.assertEqual(played, [])
+      # Regenerating a strategy only plays its candidate again
+      changed = algos[0]
+      self.addCleanup(setattr, changed, "source_hash", changed.source_hash)
+      changed.source_hash = "regenerated"
+      attitude = next(i for i, c in enumerate(algorithms.create_classes(algos, suffix="_1")) if changed in c.strategies)
+      self.assertEqual(ranking.play_candidates(play, algos, sorted(expected), 2, 1, store), expected)
+      self.assertEqual(set(played), {(1, attitude)})
+      self.assertEqual(len(store), len(expected) + 1)
+      store.close()
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,141 @@
+import ast
+import textwrap
+import unittest
+
+import axelrod as axl
+
+from evollm import rewrite
+
+HEADER = """
+import axelrod as axl
+from evollm.common import LLM_Strategy, auto_update_score
+C, D = axl.Action.C, axl.Action.D
+"""
+
+# Expressions of self and opponent that are rewritten, and those that must be left alone
+REWRITTEN = [
+    "self.history[-5:].count(D)",
+    "opponent.history[2:-1].count(C)",
+    "opponent.history[len(self.history) - 3:].count(D)",
+    "list(opponent.history[-3:]).count(D)",
+    "list(self.history).count(C)",
+    "D in opponent.history[-4:]",
+    "C not in self.history[-2:]",
+    "D in list(opponent.history)",
+    "all(a == D for a in opponent.history[-3:])",
+    "all(C == a for a in self.history[1:4])",
+    "any(a == C for a in list(self.history[-6:]))",
+    "any(a != D for a in opponent.history[1:4])",
+    "all(a != C for a in opponent.history[-2:])",
+    "all(opponent.history[-i] == D for i in range(1, 3 + 1))",
+    "all(opponent.history[-i] == C for i in range(1, 4))",
+    "all(self.history[-i] == D for i in range(1, len(opponent.history) // 4 + 1))",
+    "len(opponent.history)",
+    # Out of range bounds
+    "self.history[5:2].count(C)",
+    "opponent.history[-100:100].count(C)",
+    "D in self.history[50:]",
+    "all(opponent.history[-i] == D for i in range(1, 40))",
+]
+UNCHANGED = [
+    # axl.History has no count
+    "opponent.history.count(D)",
+    # The bound has a side effect
+    "opponent.history[self.bump():].count(D)",
+    "opponent.history[::2].count(D)",
+    "all(a == D for a in opponent.history[-3:] if a)",
+    "all(opponent.history[-i] == D for i in range(2, 4))",
+]
+
+
+def module(expressions: list[str], params: str = "self, opponent") -> str:
+  """Strategy with a helper method per expression, each recorded every move with what it raises."""
+  first, second = [p.strip() for p in params.split(",")]
+  methods = "".join(f"\n  def e{i}({params}):\n    return {e.replace('self.', first + '.').replace('opponent.', second + '.')}\n"
+                    for i, e in enumerate(expressions))
+  return HEADER + textwrap.dedent("""
+  class Probe(LLM_Strategy):
+    name = "Probe"
+    bumps = 0
+
+    def __init__(self):
+      super().__init__()
+      self.values = []
+
+    def bump(self):
+      self.bumps += 1
+      return -2
+
+    @auto_update_score
+    def strategy(self, opponent):
+      values = []
+      for i in range(EXPRESSIONS):
+        try:
+          values.append(getattr(self, f"e{i}")(opponent))
+        except Exception as e:
+          values.append(type(e))
+      self.values.append((values, self.bumps))
+      return D if self._random.random() < 0.4 else C
+  """).replace("EXPRESSIONS", str(len(expressions))) + methods
+
+
+def load(source: str, rewritten: bool) -> type:
+  tree = ast.parse(source)
+  if rewritten:
+    tree, _ = rewrite.rewrite_tree(tree)
+  namespace = {}
+  exec(compile(tree, "<probe>", "exec"), namespace)
+  return namespace["Probe"]
+
+
+def rewrites(expression: str, params: str = "self, opponent") -> int:
+  return rewrite.rewrite_tree(ast.parse(module([expression], params)))[1]
+
+
+class TestRewrite(unittest.TestCase):
+  def test_patterns(self):
+    for expression in REWRITTEN:
+      self.assertGreater(rewrites(expression), 0, expression)
+    for expression in UNCHANGED:
+      self.assertEqual(rewrites(expression), 0, expression)
+
+  def test_rebound_opponent(self):
+    source = HEADER + textwrap.dedent("""
+    class Probe(LLM_Strategy):
+      @auto_update_score
+      def strategy(self, opponent):
+        opponent = self
+        return D if opponent.history[-3:].count(D) else C
+    """)
+    self.assertEqual(rewrite.rewrite_tree(ast.parse(source))[1], 0)
+
+  def test_only_auto_updated_strategies(self):
+    source = HEADER + textwrap.dedent("""
+    class Probe(LLM_Strategy):
+      def strategy(self, opponent):
+        return D if opponent.history[-3:].count(D) else C
+    """)
+    self.assertEqual(rewrite.rewrite_tree(ast.parse(source))[1], 0)
+
+  def test_rewritten_values_match(self):
+    for params in ["self, opponent", "me, them"]:
+      source = module(REWRITTEN + UNCHANGED, params)
+      for opponent in [axl.Random(), axl.Defector(), load(source, False)()]:
+        with self.subTest(params=params, opponent=opponent):
+          players = []
+          for rewritten in [False, True]:
+            player = load(source, rewritten)()
+            axl.Match((player, opponent.clone()), turns=30, noise=0.1, seed=1).play()
+            players.append(player)
+          self.assertEqual(len(players[0].values), 30)
+          self.assertEqual(players[0].values, players[1].values)
+
+  def test_bare_count_still_raises(self):
+    source = module(["opponent.history.count(D)"])
+    player = load(source, True)()
+    axl.Match((player, axl.Cooperator()), turns=3).play()
+    self.assertEqual(player.values[-1][0], [AttributeError])
+
+
+if __name__ == "__main__":
+  unittest.main()
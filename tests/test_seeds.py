@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from evollm import seeds
+
+
+class TestSeeds(unittest.TestCase):
+  def test_shards_reproduce_the_batch(self):
+    batch = seeds.stream_seeds(1, seeds.MORAN_RUNS, range(20))
+    for count in [1, 3, 7]:
+      merged = {}
+      for index in range(count):
+        runs = seeds.shard(20, index, count)
+        merged.update(zip(runs, seeds.stream_seeds(1, seeds.MORAN_RUNS, runs)))
+      self.assertEqual([merged[run] for run in range(20)], batch)
+
+  def test_streams_differ(self):
+    self.assertNotEqual(seeds.stream_seeds(1, seeds.MORAN_RUNS, range(5)),
+                        seeds.stream_seeds(1, seeds.PAYOFFS, range(5)))
+    self.assertNotEqual(seeds.stream_seeds(1, seeds.MORAN_RUNS, range(5)),
+                        seeds.stream_seeds(2, seeds.MORAN_RUNS, range(5)))
+
+  def test_numpy_seeds_keep_the_full_entropy(self):
+    sequences = seeds.stream_sequences(1, seeds.MORAN_RUNS, range(5))
+    self.assertEqual([seeds.int_seed(s) for s in sequences], seeds.stream_seeds(1, seeds.MORAN_RUNS, range(5)))
+    # NumPy generators get the whole sequence, not the 32-bit seed drawn from it
+    self.assertNotEqual(np.random.default_rng(sequences[0]).random(),
+                        np.random.default_rng(seeds.int_seed(sequences[0])).random())
+
+  def test_children(self):
+    sequence = seeds.stream_sequences(1, seeds.MORAN_RUNS, [3])[0]
+    children = seeds.children(sequence, 2)
+    self.assertEqual(seeds.children(sequence, 2)[1].spawn_key, children[1].spawn_key)
+    self.assertEqual([c.generate_state(4).tolist() for c in children],
+                     [c.generate_state(4).tolist() for c in sequence.spawn(2)])
+    self.assertNotEqual(children[0].generate_state(4).tolist(), children[1].generate_state(4).tolist())
+    self.assertNotEqual(children[0].generate_state(4).tolist(), sequence.generate_state(4).tolist())
+
+  def test_merge_runs(self):
+    with tempfile.TemporaryDirectory() as directory:
+      paths = [os.path.join(directory, f"{i}.json") for i in range(3)]
+      seeds.save_runs(paths[0], 1, {0: ["A", 3], 2: ["B", 5]})
+      seeds.save_runs(paths[1], 1, {1: ["A", 4]})
+      seeds.save_runs(paths[2], 1, {2: ["B", 5]})
+      self.assertEqual(seeds.merge_runs(paths[:2]), (1, {0: ["A", 3], 1: ["A", 4], 2: ["B", 5]}))
+      with self.assertRaises(AssertionError):
+        seeds.merge_runs(paths)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from evollm import moran, plot_trajectories, trajectories
+
+
+class TestTrajectories(unittest.TestCase):
+  def test_round_trip(self):
+    mp = moran.MatrixMoranProcess(np.array([[3, 0, 1], [5, 1, 2], [1, 1, 1]]), ["a", "b", "c"], [10, 10, 10], seed=2)
+    populations = mp.play()
+    data = trajectories.from_populations(populations, ["a", "b", "c"])
+    counts = np.array([[p[name] for name in "abc"] for p in populations])
+    np.testing.assert_array_equal(trajectories.decode(data), counts)
+    self.assertEqual(trajectories.length(data), len(mp))
+    # Runs of identical steps are stored once
+    self.assertLess(len(data), counts.nbytes)
+
+  def test_lockstep_trajectories(self):
+    payoffs = np.array([[1, 5, 2], [0, 3, 1], [4, 2, 2]])
+    winners, lengths, encoded = moran.lockstep_trajectories(payoffs, [3, 2, 2], list(range(30)))
+    for winner, length, data in zip(winners, lengths, encoded):
+      counts = trajectories.decode(data)
+      self.assertEqual(len(counts), length)
+      np.testing.assert_array_equal(counts[0], [3, 2, 2])
+      self.assertEqual(counts[-1, winner], 7)
+      self.assertTrue((np.abs(np.diff(counts, axis=0)).sum(axis=1) <= 2).all())
+
+  def test_store(self):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "trajectories.sqlite")
+      store = trajectories.TrajectoryStore(path)
+      store.set_meta(["a", "b"], 1)
+      store.put(3, trajectories.encode([[1, 1], [2, 0]]))
+      store.put(1, trajectories.encode([[1, 1], [1, 1], [0, 2]]))
+      store.close()
+      store = trajectories.TrajectoryStore(path)
+      self.assertEqual(store.meta("names"), ["a", "b"])
+      self.assertEqual(store.runs(), [1, 3])
+      self.assertEqual(store.lengths(), {1: 3, 3: 2})
+      with self.assertRaises(AssertionError):
+        store.set_meta(["a", "b"], 2)
+      mean, quantiles = trajectories.bands([store.get(1), store.get(3)], quantiles=[0.5])
+      np.testing.assert_array_equal(mean, [[1, 1], [1.5, 0.5], [1, 1]])
+      self.assertEqual(quantiles.shape, (1, 3, 2))
+
+  def test_plot_shards(self):
+    payoffs = np.array([[1, 5, 2], [0, 3, 1], [4, 2, 2]])
+    _, _, encoded = moran.lockstep_trajectories(payoffs, [3, 2, 2], list(range(20)))
+    with tempfile.TemporaryDirectory() as directory:
+      paths = [os.path.join(directory, f"{i}.sqlite") for i in range(2)]
+      for index, path in enumerate(paths):
+        store = trajectories.TrajectoryStore(path)
+        store.set_meta(["a", "b", "c"], 1)
+        for run in range(index, 20, 2):
+          store.put(run, encoded[run])
+        store.close()
+      names, runs = plot_trajectories.load(paths)
+      self.assertEqual(names, ["a", "b", "c"])
+      self.assertEqual([trajectories.encode(r) for r in runs], encoded)
+      ax = plot_trajectories.bands_plot(names, runs)
+      self.assertEqual(len(ax.get_legend().get_texts()), 3)
+
+
+if __name__ == "__main__":
+  unittest.main()